@@ -1,19 +1,34 @@
+import logging
+import time
+
 from cms.forms.widgets import PlaceholderPluginEditorWidget
 from cms.models.pluginmodel import CMSPlugin
 from cms.utils import get_language_from_request
+from cmsplugin_blog.cache import bump_generation, cached
+from cmsplugin_blog.loaders import load_translations
 from cmsplugin_blog.models import Entry, EntryTitle
 from cmsplugin_blog.widgets import AutoCompleteTagInput
 from django import forms
 from django.contrib import admin
+from django.contrib.admin.views.main import ChangeList
+from django.core.urlresolvers import reverse
+from django.db import connection, transaction
+from django.db.models import Count
 from django.conf import settings
 from django.forms import CharField
 from django.http import HttpResponse
 from django.template.defaultfilters import title
+from django.utils import simplejson
 from django.utils.text import capfirst
 from django.utils.translation import ugettext_lazy as _
 from simple_translation.admin import PlaceholderTranslationAdmin
 from simple_translation.forms import TranslationModelForm
 from simple_translation.utils import get_translation_queryset
+from tagging.models import Tag
+
+TAG_AUTOCOMPLETE_LIMIT = 20
+
+logger = logging.getLogger(__name__)
 
 class EntryForm(TranslationModelForm):
         
@@ -21,6 +36,14 @@ class EntryForm(TranslationModelForm):
         model = Entry
         widgets = {'tags': AutoCompleteTagInput}
         
+class EntryChangeList(ChangeList):
+
+    def get_results(self, request):
+        super(EntryChangeList, self).get_results(request)
+        # evaluates the page in place, the list_editable formset reuses the
+        # same queryset and its cached entries
+        load_translations(self.result_list)
+
 class M2MPlaceholderAdmin(PlaceholderTranslationAdmin):
     
     def get_form(self, request, obj=None, **kwargs):
@@ -32,9 +55,10 @@ class M2MPlaceholderAdmin(PlaceholderTranslationAdmin):
         
         if obj:        
             
+            placeholders = obj.get_placeholders(create=True)
             for placeholder_name in obj._meta.get_field('placeholders').placeholders:
                 
-                placeholder, created = obj.placeholders.get_or_create(slot=placeholder_name)
+                placeholder = placeholders[placeholder_name]
                 
                 defaults = {'label': capfirst(placeholder_name), 'help_text': ''}
                 defaults.update(kwargs)
@@ -60,39 +84,60 @@ class M2MPlaceholderAdmin(PlaceholderTranslationAdmin):
 
         return given_fieldsets
             
-    def move_plugin(self, request): # pragma: no cover
-        
-        def get_placeholder(plugin, request):
-            
-            return plugin.placeholder
-            
-        if request.method == "POST":    
-            if 'plugin_id' in request.POST:
-                plugin = CMSPlugin.objects.get(pk=int(request.POST['plugin_id']))
-                if "placeholder" in request.POST:
-                    obj = plugin.placeholder._get_attached_model().objects.get(placeholders__cmsplugin=plugin)
-                    placeholder = obj.placeholders.get(slot=request.POST["placeholder"])
-                else:
-                    placeholder = plugin.placeholder
-                # plugin positions are 0 based, so just using count here should give us 'last_position + 1'
-                position = CMSPlugin.objects.filter(placeholder=placeholder).count()
-                plugin.placeholder = placeholder
-                plugin.position = position
-                plugin.save()
-            pos = 0
-            if 'ids' in request.POST:
-                for id in request.POST['ids'].split("_"):
-                    plugin = CMSPlugin.objects.get(pk=id)
-                    if plugin.position != pos:
-                        plugin.position = pos
-                        plugin.save()
-                    pos += 1
+    @transaction.commit_on_success
+    def move_plugin(self, request):
+        started = time.time()
+        if request.method != "POST":
+            return HttpResponse(str("error"))
+        if 'plugin_id' in request.POST:
+            plugin = CMSPlugin.objects.get(pk=int(request.POST['plugin_id']))
+            if "placeholder" in request.POST:
+                obj = plugin.placeholder._get_attached_model().objects.get(placeholders__cmsplugin=plugin)
+                placeholder = obj.placeholders.get(slot=request.POST["placeholder"])
             else:
-                HttpResponse(str("error"))
-            return HttpResponse(str("ok"))
-        else:
-            return HttpResponse(str("error"))        
-                
+                placeholder = plugin.placeholder
+            # plugin positions are 0 based, so just using count here should give us 'last_position + 1'
+            position = CMSPlugin.objects.filter(placeholder=placeholder).count()
+            plugin.placeholder = placeholder
+            plugin.position = position
+            plugin.save()
+        if 'ids' in request.POST:
+            try:
+                ids = [int(id) for id in request.POST['ids'].split("_")]
+            except ValueError:
+                return HttpResponse(str("error"))
+            if not self.reorder_plugins(request, ids):
+                return HttpResponse(str("error"))
+            logger.debug('Reordered %s plugins in %.1f ms', len(ids), (time.time() - started) * 1000)
+        return HttpResponse(str("ok"))
+
+    def reorder_plugins(self, request, ids):
+        """
+        Moves the plugins with the given ids to the positions of their ids in
+        the list, with a single update. They all have to be in the same
+        placeholder of an object of this admin. Returns whether they were.
+        """
+        if not self.has_change_permission(request) or len(set(ids)) != len(ids):
+            return False
+        attached = self.model._meta.get_field('placeholders').related_query_name()
+        plugins = CMSPlugin.objects.filter(pk__in=ids, **{'placeholder__%s__isnull' % attached: False}).values_list(
+            'pk', 'placeholder', 'position').distinct()
+        positions = dict((pk, position) for pk, placeholder, position in plugins)
+        if len(positions) != len(ids) or len(set([placeholder for pk, placeholder, position in plugins])) != 1:
+            return False
+        changed = [(pk, position) for position, pk in enumerate(ids) if positions[pk] != position]
+        if changed:
+            qn = connection.ops.quote_name
+            cursor = connection.cursor()
+            cursor.execute('UPDATE %s SET %s = CASE %s %s END WHERE %s IN (%s)' % (
+                qn(CMSPlugin._meta.db_table), qn('position'), qn('id'),
+                ' '.join(['WHEN %s THEN %s'] * len(changed)), qn('id'), ', '.join(['%s'] * len(changed))),
+                [value for pair in changed for value in pair] + [pk for pk, position in changed])
+            transaction.set_dirty()
+            # the update bypasses the plugins' save signals
+            bump_generation()
+        return True
+
 class BaseEntryAdmin(M2MPlaceholderAdmin):
     
     form = EntryForm
@@ -106,15 +151,45 @@ class BaseEntryAdmin(M2MPlaceholderAdmin):
     list_filter = ('is_published', 'pub_date')
     date_hierarchy = 'pub_date'
 
+    def get_changelist(self, request, **kwargs):
+        return EntryChangeList
+
+    def get_form(self, request, obj=None, **kwargs):
+        form = super(BaseEntryAdmin, self).get_form(request, obj, **kwargs)
+        if 'tags' in form.base_fields:
+            # the suggestions of the admin site the form is shown in
+            form.base_fields['tags'].widget.tags_url = reverse('%s:%s_%s_tags' % (self.admin_site.name,
+                self.model._meta.app_label, self.model._meta.module_name))
+        return form
+
+    def get_translations(self, obj):
+        # loaded for the whole page by EntryChangeList
+        translations = getattr(obj, 'translations', None)
+        if translations is None:
+            translations = list(get_translation_queryset(obj).select_related('author'))
+        return translations
+
+    def get_first_translation(self, obj):
+        # the title and author columns show the oldest translation, like
+        # the unordered get_translation_queryset(obj)[0] did
+        return min(self.get_translations(obj), key=lambda translation: translation.pk)
+
     def author(self, obj):
-        return get_translation_queryset(obj)[0].author
+        return self.get_first_translation(obj).author
     author.short_description = _('author')
     author.admin_order_field = 'entrytitle__author'
 
     def title(self, obj):
-        return get_translation_queryset(obj)[0].title
+        return self.get_first_translation(obj).title
     title.short_description = _('title')
     title.admin_order_field = 'entrytitle__title'
+
+    def languages(self, obj):
+        lnk = '<a href="%s/?language=%s">%s</a>'
+        return ' '.join([lnk % (obj.pk, translation.language, translation.language.upper())
+            for translation in self.get_translations(obj)])
+    languages.short_description = _('languages')
+    languages.allow_tags = True
     
     # needed because of admin validation
     def get_fieldsets(self, request, obj=None):
@@ -135,6 +210,34 @@ class BaseEntryAdmin(M2MPlaceholderAdmin):
             translation_obj.author=request.user
         super(BaseEntryAdmin, self).save_translated_model(request, obj, translation_obj, form, change)
 
+    def get_urls(self):
+        from django.conf.urls.defaults import patterns, url
+        info = "%s_%s" % (self.model._meta.app_label, self.model._meta.module_name)
+        url_patterns = patterns('',
+            url(r'^tags/$', self.admin_site.admin_view(self.tag_autocomplete), name='%s_tags' % info),
+        )
+        return url_patterns + super(BaseEntryAdmin, self).get_urls()
+
+    def tag_autocomplete(self, request):
+        """
+        Returns a page of the tags of entries starting with ``term``, the most
+        used first, as JSON.
+        """
+        term = request.GET.get('term', '').strip()
+        try:
+            page = max(int(request.GET.get('page', 1)), 1)
+        except ValueError:
+            page = 1
+        offset = (page - 1) * TAG_AUTOCOMPLETE_LIMIT
+        def get_tags():
+            # one more to find out whether there is another page
+            tags = [name for name, count in Tag.objects.filter(name__istartswith=term).annotate(
+                count=Count('entrytag')).filter(count__gt=0).order_by('-count', 'name').values_list(
+                'name', 'count')[offset:offset + TAG_AUTOCOMPLETE_LIMIT + 1]]
+            return {'tags': tags[:TAG_AUTOCOMPLETE_LIMIT], 'has_more': len(tags) > TAG_AUTOCOMPLETE_LIMIT}
+        result = cached('tag_autocomplete', [term.lower(), page, TAG_AUTOCOMPLETE_LIMIT], get_tags)
+        return HttpResponse(simplejson.dumps(result), mimetype='application/json')
+
 if 'guardian' in settings.INSTALLED_APPS: # pragma: no cover
     from guardian.admin import GuardedModelAdmin
     class EntryAdmin(BaseEntryAdmin, GuardedModelAdmin):
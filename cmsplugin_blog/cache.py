@@ -0,0 +1,211 @@
+import datetime
+import threading
+import time
+try:
+    from collections import OrderedDict
+except ImportError: # pragma: no cover
+    from django.utils.datastructures import SortedDict as OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.encoding import smart_str
+from django.utils.hashcompat import md5_constructor
+
+CMSPLUGIN_BLOG_CACHE_TIMEOUT = getattr(settings, 'CMSPLUGIN_BLOG_CACHE_TIMEOUT', 60 * 60 * 24)
+
+CMSPLUGIN_BLOG_LOOKUP_CACHE_SIZE = getattr(settings, 'CMSPLUGIN_BLOG_LOOKUP_CACHE_SIZE', 1000)
+
+GENERATION_KEY = 'cmsplugin_blog:generation'
+
+CHANGE_KEY = 'cmsplugin_blog:changed'
+
+LOOKUP_GENERATION_KEY = 'cmsplugin_blog:lookup_generation'
+
+BLOG_ROOTS_GENERATION_KEY = 'cmsplugin_blog:blog_roots_generation'
+
+PAGES_CHANGE_KEY = 'cmsplugin_blog:pages_changed'
+
+def _get_counter(key):
+    generation = cache.get(key)
+    if generation is None:
+        # start from the clock so a lost counter never reuses old keys
+        generation = int(time.time() * 1000)
+        cache.add(key, generation, CMSPLUGIN_BLOG_CACHE_TIMEOUT)
+        generation = cache.get(key, generation)
+    return generation
+
+def _bump_counter(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, int(time.time() * 1000), CMSPLUGIN_BLOG_CACHE_TIMEOUT)
+
+def get_generation():
+    """
+        Returns the current generation of the blog cache. Every cache key
+        contains it, so bumping it invalidates everything cached before.
+    """
+    return _get_counter(GENERATION_KEY)
+
+def bump_generation(*args, **kwargs):
+    """
+        Invalidates the blog cache, can be connected to model signals
+    """
+    _bump_counter(GENERATION_KEY)
+    cache.set(CHANGE_KEY, datetime.datetime.now(), CMSPLUGIN_BLOG_CACHE_TIMEOUT)
+
+def get_lookup_generation():
+    """
+        Returns the generation of the detail lookups (see cached_lookup),
+        which only change with the slugs, languages and publication of entries
+    """
+    return _get_counter(LOOKUP_GENERATION_KEY)
+
+def bump_lookup_generation(*args, **kwargs):
+    """
+        Invalidates the detail lookups, can be connected to model signals
+    """
+    _bump_counter(LOOKUP_GENERATION_KEY)
+
+def get_blog_roots_generation():
+    """
+        Returns the generation of the blog roots every process keeps (see
+        cmsplugin_blog.utils.get_blog_root)
+    """
+    return _get_counter(BLOG_ROOTS_GENERATION_KEY)
+
+def bump_blog_roots_generation():
+    """
+        Makes every process look the blog roots up again
+    """
+    _bump_counter(BLOG_ROOTS_GENERATION_KEY)
+
+def _get_change(key):
+    changed = cache.get(key)
+    if changed is None:
+        changed = datetime.datetime.now()
+        cache.add(key, changed, CMSPLUGIN_BLOG_CACHE_TIMEOUT)
+        changed = cache.get(key, changed)
+    return changed
+
+def get_last_change():
+    """
+        Returns when the blog last changed, or now if the cache forgot
+    """
+    return _get_change(CHANGE_KEY)
+
+def get_pages_change():
+    """
+        Returns when the cms pages last changed, or now if the cache forgot.
+        The blog views render the page the blog is hooked into, its menu
+        and its other placeholders.
+    """
+    return _get_change(PAGES_CHANGE_KEY)
+
+def bump_pages_change(*args, **kwargs):
+    """
+        Records a change to the cms pages, can be connected to signals
+    """
+    cache.set(PAGES_CHANGE_KEY, datetime.datetime.now(), CMSPLUGIN_BLOG_CACHE_TIMEOUT)
+
+def get_cache_key(name, *bits):
+    bits = ':'.join([str(settings.SITE_ID)] + [smart_str(bit) for bit in bits])
+    return 'cmsplugin_blog:%s:%s:%s' % (name, get_generation(), md5_constructor(bits).hexdigest())
+
+def _seconds_until(moment):
+    delta = moment - datetime.datetime.now()
+    return max(delta.days * 86400 + delta.seconds + 1, 1)
+
+def get_next_publication():
+    """
+        Returns the moment the next scheduled entry goes live (see
+        EntriesManager.next_publication), cached until then
+    """
+    from cmsplugin_blog.models import Entry
+    key = get_cache_key('next_publication')
+    value = cache.get(key)
+    if value is None:
+        value = Entry.objects.next_publication()
+        timeout = CMSPLUGIN_BLOG_CACHE_TIMEOUT
+        if value:
+            timeout = min(timeout, _seconds_until(value))
+        # None means a cache miss, store False for "nothing scheduled"
+        cache.set(key, value or False, timeout)
+    return value or None
+
+def get_timeout(timeout=None):
+    """
+        Caps the timeout so nothing cached outlives the next scheduled publication
+    """
+    timeout = timeout or CMSPLUGIN_BLOG_CACHE_TIMEOUT
+    next_publication = get_next_publication()
+    if next_publication:
+        timeout = min(timeout, _seconds_until(next_publication))
+    return timeout
+
+def cached(name, bits, callback, timeout=None):
+    """
+        Returns the cached value for (name, site, bits) or stores the result
+        of callback under that key, until the timeout or the next scheduled
+        publication
+    """
+    key = get_cache_key(name, *bits)
+    value = cache.get(key)
+    if value is None:
+        value = callback()
+        cache.set(key, value, get_timeout(timeout))
+    return value
+
+class LRUCache(object):
+    """
+        Keeps the values of the most recently used keys of a process, each
+        until its timeout
+    """
+    def __init__(self, size):
+        self.size = size
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        self.data = OrderedDict()
+
+    def get(self, key):
+        self.lock.acquire()
+        try:
+            expires, value = self.data.pop(key, (0, None))
+            if expires < time.time():
+                return None
+            self.data[key] = (expires, value)
+            return value
+        finally:
+            self.lock.release()
+
+    def set(self, key, value, timeout):
+        self.lock.acquire()
+        try:
+            self.data.pop(key, None)
+            self.data[key] = (time.time() + timeout, value)
+            while len(self.data) > self.size:
+                del self.data[iter(self.data).next()]
+        finally:
+            self.lock.release()
+
+lookups = LRUCache(CMSPLUGIN_BLOG_LOOKUP_CACHE_SIZE)
+
+def cached_lookup(bits, callback):
+    """
+        Returns the result of a lookup from the process' own LRU cache, the
+        shared cache or callback, in that order. The result must not be None,
+        store a marker for lookups that found nothing.
+    """
+    bits = ':'.join([str(settings.SITE_ID)] + [smart_str(bit) for bit in bits])
+    key = 'cmsplugin_blog:lookup:%s:%s' % (get_lookup_generation(), md5_constructor(bits).hexdigest())
+    value = lookups.get(key)
+    if value is None:
+        timeout = get_timeout()
+        value = cache.get(key)
+        if value is None:
+            value = callback()
+            cache.set(key, value, timeout)
+        lookups.set(key, value, timeout)
+    return value
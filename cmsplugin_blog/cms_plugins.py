@@ -1,6 +1,10 @@
+from django.db import connections
+from django.db.models.query import EmptyQuerySet
+from django.db.models.sql.datastructures import EmptyResultSet
+from django.template.loader import get_template
+from django.utils.safestring import mark_safe
 from django.utils.translation import ugettext_lazy as _
 
-from tagging.models import TaggedItem
 from tagging.utils import get_tag_list
 
 from cms.plugin_base import CMSPluginBase
@@ -9,7 +13,10 @@ from cms.utils import get_language_from_request
 
 from simple_translation.utils import get_translation_filter_language
 
+from cmsplugin_blog.cache import cached
+from cmsplugin_blog.loaders import load_entries
 from cmsplugin_blog.models import LatestEntriesPlugin, Entry
+from cmsplugin_blog.utils import use_listings
 
 class CMSLatestEntriesPlugin(CMSPluginBase):
     """
@@ -17,31 +24,110 @@ class CMSLatestEntriesPlugin(CMSPluginBase):
     """
     model = LatestEntriesPlugin
     name = _('Latest entries')
-    render_template = "cmsplugin_blog/latest_entries.html"
+    render_template = "cmsplugin_blog/latest_entries_plugin.html"
+    entries_template = "cmsplugin_blog/latest_entries.html"
     
     def render(self, context, instance, placeholder):
         """
-            Render the latest entries
+            Render the latest entries, cached until an entry, title, tag or
+            plugin changes (except in edit mode, which renders the toolbar
+            of each entry placeholder)
         """
-        qs = Entry.published.all()
-        
-        if instance.current_language_only:
-            language = get_language_from_request(context["request"])
-            kw = get_translation_filter_language(Entry, language)
-            qs = qs.filter(**kw)
-            
-        if instance.tagged:
-            tags = get_tag_list(instance.tagged)
-            qs  = TaggedItem.objects.get_by_model(qs , tags)
-            
-        latest = qs[:instance.limit]
-        
+        request = context["request"]
+        language = get_language_from_request(request)
         context.update({
             'instance': instance,
-            'latest': latest,
-            'object_list': latest,
             'placeholder': placeholder
         })
+        if getattr(getattr(request, 'toolbar', None), 'edit_mode', False):
+            content = self.render_entries(context, instance, language)
+        else:
+            content = cached('latest_entries',
+                [instance.pk, instance.limit, instance.current_language_only, instance.tagged, language],
+                lambda: self.render_entries(context, instance, language))
+        context['content'] = mark_safe(content)
         return context
 
+    def render_entries(self, context, instance, language):
+        latest = self.get_batch(context["request"], instance, language)[instance.pk]
+        context.update({
+            'latest': latest,
+            'object_list': latest
+        })
+        return get_template(self.entries_template).render(context)
+
+    def get_batch(self, request, instance, language):
+        """
+            Resolves the entries of all latest entries plugins in the
+            placeholder of the instance at once and keeps them on the request
+            for the plugins rendered after it
+        """
+        batches = getattr(request, '_latest_entries_batches', None)
+        if batches is None:
+            batches = request._latest_entries_batches = {}
+        key = (instance.placeholder_id, instance.language, language)
+        if instance.pk not in batches.get(key, {}):
+            plugins = [plugin for plugin in LatestEntriesPlugin.objects.filter(
+                placeholder=instance.placeholder_id, language=instance.language) if plugin.pk != instance.pk]
+            batches[key] = self.resolve_entries([instance] + plugins, language, request)
+        return batches[key]
+
+    def resolve_entries(self, plugins, language, request):
+        """
+            Returns the entries of each plugin by plugin id, selected with a
+            single UNION of the plugin querysets and loaded together
+        """
+        if len(plugins) == 1:
+            plugin = plugins[0]
+            return {plugin.pk: load_entries(self.get_queryset(plugin, language)[:plugin.limit], request=request)}
+        parts, params = [], []
+        for plugin in plugins:
+            qs = self.get_queryset(plugin, language)
+            if isinstance(qs, EmptyQuerySet):
+                continue
+            qs = qs.values_list('pk', flat=True)[:plugin.limit]
+            try:
+                sql, part_params = qs.query.get_compiler(qs.db).as_sql()
+            except EmptyResultSet:
+                continue
+            # LIMIT and ORDER BY are only allowed in a derived table
+            parts.append('SELECT %d, latest_%d.id FROM (%s) latest_%d' % (plugin.pk, plugin.pk, sql, plugin.pk))
+            params.extend(part_params)
+        rows = []
+        if parts:
+            cursor = connections[Entry.objects.db].cursor()
+            cursor.execute(' UNION ALL '.join(parts), params)
+            rows = cursor.fetchall()
+        entries = Entry.objects.in_bulk(set([entry_id for plugin_id, entry_id in rows]))
+        load_entries(entries.values(), request=request)
+        latest = dict([(plugin.pk, []) for plugin in plugins])
+        for plugin_id, entry_id in rows:
+            latest[plugin_id].append(entries[entry_id])
+        for plugin_entries in latest.values():
+            # the order within each part of a UNION is lost
+            plugin_entries.sort(key=lambda entry: entry.pub_date, reverse=True)
+        return latest
+
+    def get_queryset(self, instance, language):
+        """
+            Returns the published entries selected by the plugin settings
+        """
+        if instance.tagged:
+            tags = get_tag_list(instance.tagged)
+            if not tags:
+                return Entry.objects.none()
+            # entries tagged with all of the tags
+            qs = Entry.objects.tagged_with(tags[0])
+            for tag in tags[1:]:
+                qs = qs.filter(entrytag__tag=tag)
+        elif instance.current_language_only and use_listings():
+            return Entry.objects.listed(language)
+        else:
+            qs = Entry.published.all()
+        
+        if instance.current_language_only:
+            kw = get_translation_filter_language(Entry, language)
+            qs = qs.filter(**kw)
+        return qs
+
 plugin_pool.register_plugin(CMSLatestEntriesPlugin)
@@ -0,0 +1,39 @@
+import datetime
+import time
+
+from django.conf import settings
+from django.utils.encoding import smart_str
+from django.utils.hashcompat import md5_constructor
+from django.views.decorators.http import condition
+
+from cmsplugin_blog.cache import cached, get_generation, get_last_change, get_pages_change
+from cmsplugin_blog.models import Entry
+
+def get_last_modified(request, *args, **kwargs):
+    """
+        The blog changes when something is saved (see bump_generation),
+        when the cms pages around it change (see bump_pages_change) and when
+        a scheduled entry goes live, whichever happened last. Editors see
+        drafts and the toolbar, so they get no validators.
+    """
+    if request.user.is_authenticated():
+        return None
+    modified = max(get_last_change(), get_pages_change())
+    # False is stored for "nothing published yet"
+    last_publication = cached('last_publication', [], lambda: Entry.objects.last_publication() or False)
+    if last_publication and last_publication > modified:
+        modified = last_publication
+    # naive local time to naive UTC, as expected by condition()
+    return datetime.datetime.utcfromtimestamp(time.mktime(modified.timetuple()))
+
+def get_etag(request, *args, **kwargs):
+    modified = get_last_modified(request, *args, **kwargs)
+    if modified is None:
+        return None
+    # the changes of the pages are more precise than Last-Modified's seconds
+    bits = [settings.SITE_ID, get_generation(), get_pages_change().isoformat(), modified.isoformat(),
+        getattr(request, 'LANGUAGE_CODE', ''), request.get_full_path()]
+    return md5_constructor(':'.join([smart_str(bit) for bit in bits])).hexdigest()
+
+# answers conditional GETs with 304 Not Modified before the view renders anything
+conditional = condition(etag_func=get_etag, last_modified_func=get_last_modified)
@@ -1,16 +1,20 @@
 from django.contrib.sites.models import get_current_site
 from django.contrib.syndication.views import Feed
 from django.core.urlresolvers import reverse
+from django.http import Http404, HttpResponse
 from django.utils.translation import ugettext_lazy as _
 
 from cms import settings
 from cms.utils import get_language_from_request
-from simple_translation.translation_pool import translation_pool
+from tagging.utils import get_tag_list
+
 from simple_translation.templatetags.simple_translation_tags import get_preferred_translation_from_lang
 from simple_translation.utils import get_translation_filter, get_translation_filter_language
 
-from cmsplugin_blog.models import Entry
-from cmsplugin_blog.utils import is_multilingual, get_lang_name, add_current_root
+from cmsplugin_blog.cache import cached
+from cmsplugin_blog.loaders import load_entries
+from cmsplugin_blog.models import AuthorCount, Entry
+from cmsplugin_blog.utils import is_multilingual, get_lang_name, add_current_root, use_listings
 
 class EntriesFeed(Feed):
     title_template = "cmsplugin_blog/feed_entries_title.html"
@@ -24,6 +28,22 @@ class EntriesFeed(Feed):
         if is_multilingual():
             self.language_namespace = '%s:' % self.language_code
         return None
+
+    def __call__(self, request, *args, **kwargs):
+        """
+            Serves the finished feed document from the cache, which is
+            invalidated whenever an entry, title, tag or plugin changes
+        """
+        obj = self.get_object(request, *args, **kwargs)
+        def render():
+            feedgen = self.get_feed(obj, request)
+            return (feedgen.mime_type, feedgen.writeString('utf-8'))
+        mime_type, content = cached('feed', self.get_cache_bits(request), render)
+        return HttpResponse(content, mimetype=mime_type)
+
+    def get_cache_bits(self, request):
+        return [self.__class__.__name__, self.language_code, bool(self.any_language),
+            is_multilingual(), request.is_secure()]
     
     def feed_url(self, obj):
         if self.any_language:
@@ -49,14 +69,16 @@ class EntriesFeed(Feed):
     def get_queryset(self, obj):
         if not is_multilingual() or self.any_language :
             qs = Entry.published.order_by('-pub_date')
+        elif use_listings():
+            qs = Entry.objects.listed(self.language_code)
         else:
             kw = get_translation_filter_language(Entry, self.language_code)
             qs = Entry.published.filter(**kw).order_by('-pub_date').distinct()
         return qs
         
     def items(self, obj):
-        items = self.get_queryset(obj)[:10]
-        items = [get_preferred_translation_from_lang(title, self.language_code) for title in translation_pool.annotate_with_translations(items)]
+        items = load_entries(self.get_queryset(obj)[:10], language=self.language_code)
+        items = [get_preferred_translation_from_lang(entry, self.language_code) for entry in items]
         return items
         
     def item_pubdate(self, item):
@@ -69,7 +91,14 @@ class TaggedEntriesFeed(EntriesFeed):
     def get_object(self, request, **kwargs):
         super(TaggedEntriesFeed, self).get_object(request, **kwargs)
         self.tag = kwargs.get('tag')
+        # the entries tagged with any of the tags, as tagging's with_any
+        self.tags = list(get_tag_list(self.tag))
+        if not self.tags:
+            raise Http404
         return None
+
+    def get_cache_bits(self, request):
+        return super(TaggedEntriesFeed, self).get_cache_bits(request) + sorted([tag.pk for tag in self.tags])
     
     def title(self, obj):
         title = super(TaggedEntriesFeed, self).title(obj)
@@ -88,8 +117,10 @@ class TaggedEntriesFeed(EntriesFeed):
         return _(u'%(description)s tagged "%(tag)s"') % {'description': description, 'tag': self.tag}
         
     def get_queryset(self, obj):
-        qs = super(TaggedEntriesFeed, self).get_queryset(obj)
-        return Entry.tagged.with_any(self.tag, queryset=qs).distinct()
+        qs = Entry.objects.tagged_with(self.tags)
+        if is_multilingual() and not self.any_language:
+            qs = qs.filter(**get_translation_filter_language(Entry, self.language_code))
+        return qs
         
 class AuthorEntriesFeed(EntriesFeed):
     title_template = "cmsplugin_blog/feed_author_title.html"
@@ -98,7 +129,12 @@ class AuthorEntriesFeed(EntriesFeed):
     def get_object(self, request, **kwargs):
         super(AuthorEntriesFeed, self).get_object(request, **kwargs)
         self.author = kwargs.get('author')
+        if not AuthorCount.objects.filter(username=self.author).exists():
+            raise Http404
         return None
+
+    def get_cache_bits(self, request):
+        return super(AuthorEntriesFeed, self).get_cache_bits(request) + [self.author]
     
     def title(self, obj):
         title = super(AuthorEntriesFeed, self).title(obj)
@@ -117,6 +153,8 @@ class AuthorEntriesFeed(EntriesFeed):
         return _(u'%(description)s by %(author)s') % {'description': description, 'author': self.author}
     
     def get_queryset(self, obj):
+        if use_listings() and is_multilingual() and not self.any_language:
+            return Entry.objects.listed(self.language_code, author_username=self.author)
         qs = super(AuthorEntriesFeed, self).get_queryset(obj)
-        kw = get_translation_filter(Entry, **{'author__username': self.author})
+        kw = get_translation_filter(Entry, author__in=AuthorCount.objects.author_ids(self.author))
         return qs.filter(**kw).distinct()
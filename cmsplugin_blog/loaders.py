@@ -0,0 +1,109 @@
+from django.conf import settings
+from django.utils.translation import get_language
+
+from cms.plugin_pool import plugin_pool
+from cms.utils import get_language_from_request
+from cms.utils.moderator import get_cmsplugin_queryset
+
+from cmsplugin_blog.models import Entry, EntryTitle
+
+def _language_key(languages):
+    def key(title):
+        try:
+            return languages.index(title.language)
+        except ValueError:
+            pass
+    return key
+
+def load_translations(entries):
+    """
+        Annotates entries with their translations (and the translations'
+        authors) in a single query, in the format used by simple_translation.
+    """
+    languages = [code for code, name in settings.LANGUAGES]
+    # an entry can be listed more than once, e.g. when ordered by its titles
+    entry_map = {}
+    for entry in entries:
+        entry.translations = []
+        entry_map.setdefault(entry.pk, []).append(entry)
+    titles = EntryTitle.objects.filter(entry__in=entry_map.keys(),
+        language__in=languages).select_related('author')
+    for title in titles:
+        # title.get_absolute_url() needs the entry's pub_date
+        title._entry_cache = entry_map[title.entry_id][0]
+        for entry in entry_map[title.entry_id]:
+            entry.translations.append(title)
+    key = _language_key(languages)
+    for entry in entries:
+        entry.translations.sort(key=key)
+
+def load_placeholders(entries):
+    """
+        Fills the slot -> placeholder map of each entry in a single query.
+    """
+    entry_map = dict((entry.pk, entry) for entry in entries)
+    for entry in entries:
+        entry._placeholders_cache = {}
+    through = Entry.placeholders.through.objects.filter(
+        entry__in=entry_map.keys()).select_related('placeholder')
+    for relation in through:
+        placeholder = relation.placeholder
+        entry_map[relation.entry_id]._placeholders_cache[placeholder.slot] = placeholder
+
+def load_plugins(placeholders, request=None, language=None):
+    """
+        Fetches the top level plugins of all given placeholders and their
+        plugin instances with one query per plugin type, and primes the caches
+        used by cms.plugins.utils.get_plugins and CMSPlugin.get_plugin_instance.
+    """
+    if request is not None:
+        language = get_language_from_request(request)
+    language = language or get_language()
+    cache_name = '_%s_plugins_cache' % language
+    placeholder_map = dict((placeholder.pk, placeholder) for placeholder in placeholders)
+    if not placeholder_map:
+        return
+    for placeholder in placeholders:
+        setattr(placeholder, cache_name, [])
+    plugins = get_cmsplugin_queryset(request).filter(
+        placeholder__in=placeholder_map.keys(), language=language, parent__isnull=True
+    ).order_by('placeholder', 'position')
+    plugin_types = {}
+    for plugin in plugins:
+        placeholder = placeholder_map[plugin.placeholder_id]
+        plugin._placeholder_cache = placeholder
+        getattr(placeholder, cache_name).append(plugin)
+        plugin_types.setdefault(plugin.plugin_type, []).append(plugin)
+    for plugin_type, type_plugins in plugin_types.items():
+        model = plugin_pool.get_plugin(plugin_type).model
+        if model is type_plugins[0].__class__:
+            continue
+        instances = model.objects.in_bulk([plugin.pk for plugin in type_plugins])
+        instance_cache_name = '_%s_cache' % model.__name__.lower()
+        for plugin in type_plugins:
+            instance = instances.get(plugin.pk)
+            if instance is None:
+                continue
+            instance._placeholder_cache = plugin._placeholder_cache
+            setattr(plugin, instance_cache_name, instance)
+
+def load_entries(entries, request=None, language=None):
+    """
+        Loads everything needed to render a list of entries (translations,
+        authors, placeholders by slot and their plugins) in a fixed number of
+        queries, independent of the number of entries. Returns a list.
+
+        Entries that have been loaded before are left untouched.
+    """
+    entries = list(entries)
+    pending = [entry for entry in entries if not getattr(entry, '_entry_loaded', False)]
+    if not pending:
+        return entries
+    load_translations(pending)
+    load_placeholders(pending)
+    placeholders = []
+    for entry in pending:
+        placeholders.extend(entry._placeholders_cache.values())
+        entry._entry_loaded = True
+    load_plugins(placeholders, request=request, language=language)
+    return entries
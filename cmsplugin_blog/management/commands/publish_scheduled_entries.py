@@ -0,0 +1,33 @@
+import datetime
+import time
+from optparse import make_option
+
+from django.core.management.base import NoArgsCommand
+
+from cmsplugin_blog.models import Entry
+
+class Command(NoArgsCommand):
+    help = 'Makes entries whose publication date has passed visible.'
+    option_list = NoArgsCommand.option_list + (
+        make_option('--interval', type='int', dest='interval', default=0,
+            help='Keep running and check again at the next scheduled publication, '
+                'but at least every INTERVAL seconds.'),
+    )
+
+    def handle_noargs(self, **options):
+        interval = options['interval']
+        verbosity = int(options.get('verbosity', 1))
+        while True:
+            for entry in Entry.objects.publish_scheduled():
+                if verbosity > 0:
+                    self.stdout.write('Published entry %s (%s)\n' % (entry.pk, entry.pub_date))
+            if not interval:
+                break
+            time.sleep(self.get_delay(interval))
+
+    def get_delay(self, interval):
+        next_publication = Entry.objects.next_publication()
+        if next_publication is None:
+            return interval
+        delta = next_publication - datetime.datetime.now()
+        return max(min(delta.days * 86400 + delta.seconds + 1, interval), 1)
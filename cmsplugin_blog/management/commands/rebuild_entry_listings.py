@@ -0,0 +1,15 @@
+from django.core.management.base import NoArgsCommand
+
+from cmsplugin_blog.models import Entry, EntryListing
+
+class Command(NoArgsCommand):
+    help = 'Rebuilds the denormalized entry listings used with CMSPLUGIN_BLOG_USE_LISTINGS.'
+
+    def handle_noargs(self, **options):
+        verbosity = int(options.get('verbosity', 1))
+        count = 0
+        for entry in Entry.objects.all().iterator():
+            EntryListing.objects.sync(entry)
+            count += 1
+        if verbosity > 0:
+            self.stdout.write('Rebuilt the listings of %s entries\n' % count)
@@ -0,0 +1,12 @@
+from django.core.management.base import NoArgsCommand
+
+from cmsplugin_blog.models import EntryTitle
+
+class Command(NoArgsCommand):
+    help = 'Stores the canonical URL of every entry title, e.g. after the blog page has been moved.'
+
+    def handle_noargs(self, **options):
+        verbosity = int(options.get('verbosity', 1))
+        count = EntryTitle.objects.rebuild_urls()
+        if verbosity > 0:
+            self.stdout.write('Rebuilt %s entry URLs\n' % count)
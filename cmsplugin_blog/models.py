@@ -1,31 +1,155 @@
 import datetime
 
-from django.core.urlresolvers import reverse
-from django.db import models
+from django.core.urlresolvers import NoReverseMatch, reverse
+from django.db import IntegrityError, models, transaction
+from django.db.models import signals, Count, Max
 from django.db.models.query import QuerySet
 from django.conf import settings
-from django.utils.translation import get_language, ugettext_lazy as _
+from django.contrib.auth.models import User
+from django.contrib.contenttypes.models import ContentType
+from django.utils.translation import activate, get_language, ugettext_lazy as _
 
 from cms.utils.placeholder import PlaceholderNoAction
-from cms.utils.urlutils import urljoin
 
-from cms.models import CMSPlugin, Title
+from cms import signals as cms_signals
+from cms.models import CMSPlugin, Page, Placeholder, Title
 
 import tagging
 from tagging.fields import TagField
+from tagging.models import Tag, TaggedItem
+from tagging.utils import calculate_cloud, LOGARITHMIC
 
 from simple_translation.actions import SimpleTranslationPlaceholderActions
 from djangocms_utils.fields import M2MPlaceholderField
 
+from cmsplugin_blog.cache import bump_generation, bump_lookup_generation, bump_pages_change
+from cmsplugin_blog.utils import add_language_prefix, clear_blog_roots, get_blog_root, is_multilingual, use_listings
+
+CMSPLUGIN_BLOG_PUBLICATION_GRANULARITY = getattr(settings, 'CMSPLUGIN_BLOG_PUBLICATION_GRANULARITY', 60)
+CMSPLUGIN_BLOG_SCHEDULER = getattr(settings, 'CMSPLUGIN_BLOG_SCHEDULER', False)
+
+def get_publication_boundary(now=None):
+    """
+        Returns now rounded down to CMSPLUGIN_BLOG_PUBLICATION_GRANULARITY
+        seconds, entries published up to this moment are visible. Keeps the
+        published querysets identical (and cacheable) within that interval.
+    """
+    now = now or datetime.datetime.now()
+    granularity = CMSPLUGIN_BLOG_PUBLICATION_GRANULARITY
+    midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    seconds = now.hour * 3600 + now.minute * 60 + now.second
+    if granularity > 1:
+        seconds -= seconds % granularity
+    return midnight + datetime.timedelta(seconds=seconds)
+
+def get_publication_time(pub_date):
+    """
+        Returns the moment an entry with the given pub_date becomes visible
+    """
+    boundary = get_publication_boundary(pub_date)
+    if boundary == pub_date:
+        return pub_date
+    return boundary + datetime.timedelta(seconds=max(CMSPLUGIN_BLOG_PUBLICATION_GRANULARITY, 1))
+
+def get_published_filter():
+    """
+        Returns the lookups selecting published entries: the is_visible flag
+        when the publish_scheduled_entries command keeps it up to date
+        (CMSPLUGIN_BLOG_SCHEDULER), the publication date otherwise
+    """
+    if CMSPLUGIN_BLOG_SCHEDULER:
+        return {'is_visible': True}
+    return {'is_published': True, 'pub_date__lte': get_publication_boundary()}
+
+def is_entry_published(entry):
+    """
+        Tells whether an entry is selected by get_published_filter
+    """
+    if CMSPLUGIN_BLOG_SCHEDULER:
+        return entry.is_visible
+    return entry.is_published and entry.pub_date <= get_publication_boundary()
+
 class PublishedEntriesQueryset(QuerySet):
     
     def published(self):
-        return self.filter(is_published=True, pub_date__lte=datetime.datetime.now())
+        return self.filter(**get_published_filter())
+
+    def next_publication(self):
+        """
+            Returns the moment the next entry scheduled for the future becomes
+            visible, or None
+        """
+        pub_dates = self.filter(is_published=True, pub_date__gt=get_publication_boundary()
+            ).order_by('pub_date').values_list('pub_date', flat=True)[:1]
+        if not pub_dates:
+            return None
+        return get_publication_time(pub_dates[0])
+
+    def last_publication(self):
+        """
+            Returns the moment the newest published entry became visible, or None
+        """
+        pub_dates = self.published().order_by('-pub_date').values_list('pub_date', flat=True)[:1]
+        if not pub_dates:
+            return None
+        return get_publication_time(pub_dates[0])
+
+    def listed(self, language, **lookups):
+        """
+            Published entries translated to the given language, newest first,
+            selected through EntryListing: an indexed range scan on a single
+            row per entry, no DISTINCT needed. Extra lookups apply to the listing.
+        """
+        lookups.update(get_published_filter())
+        lookups['language'] = language
+        filters = dict([('entrylisting__%s' % key, value) for key, value in lookups.items()])
+        return self.filter(**filters).order_by('-entrylisting__pub_date')
+
+    def tagged_with(self, tag, **lookups):
+        """
+            Published entries tagged with the given tag, or with any of a
+            list of tags, newest first, selected through the integer keyed
+            EntryTag index. Extra lookups apply to the index.
+        """
+        lookups.update(get_published_filter())
+        if isinstance(tag, (list, tuple)):
+            lookups['tag__in'] = tag
+        else:
+            lookups['tag'] = tag
+        filters = dict([('entrytag__%s' % key, value) for key, value in lookups.items()])
+        qs = self.filter(**filters).order_by('-entrytag__pub_date')
+        if 'tag__in' in lookups:
+            # an entry has an index row per tag
+            qs = qs.distinct()
+        return qs
         
 class EntriesManager(models.Manager):
     
     def get_query_set(self):
         return PublishedEntriesQueryset(self.model)
+
+    def next_publication(self):
+        return self.get_query_set().next_publication()
+
+    def last_publication(self):
+        return self.get_query_set().last_publication()
+
+    def listed(self, language, **lookups):
+        return self.get_query_set().listed(language, **lookups)
+
+    def tagged_with(self, tag, **lookups):
+        return self.get_query_set().tagged_with(tag, **lookups)
+
+    def publish_scheduled(self):
+        """
+            Saves the entries whose publication date has passed since they
+            were last saved, making them visible. Returns the entries.
+        """
+        entries = list(self.get_query_set().filter(is_published=True, is_visible=False,
+            pub_date__lte=get_publication_boundary()))
+        for entry in entries:
+            entry.save()
+        return entries
                             
 class PublishedEntriesManager(EntriesManager):
     """
@@ -39,6 +163,7 @@ CMSPLUGIN_BLOG_PLACEHOLDERS = getattr(settings, 'CMSPLUGIN_BLOG_PLACEHOLDERS', (
 class Entry(models.Model):
     is_published = models.BooleanField(_('is published'))
     pub_date = models.DateTimeField(_('publish at'), default=datetime.datetime.now)
+    is_visible = models.BooleanField(_('is visible'), editable=False, db_index=True)
  
     placeholders = M2MPlaceholderField(actions=SimpleTranslationPlaceholderActions(), placeholders=CMSPLUGIN_BLOG_PLACEHOLDERS)
     
@@ -47,16 +172,30 @@ class Entry(models.Model):
     objects = EntriesManager()
     published = PublishedEntriesManager()
 
+    def save(self, *args, **kwargs):
+        self.is_visible = bool(self.is_published and self.pub_date <= get_publication_boundary())
+        super(Entry, self).save(*args, **kwargs)
+
     def get_absolute_url(self, language=None):
         if not language:
             language = get_language()
         try:
-            url = self.entrytitle_set.get(language=language).get_absolute_url()
-            if url[1:len(language)+1] == language:
-                url = url[len(language)+1:]
-            return url
+            title = self.get_title(language)
         except EntryTitle.DoesNotExist:
             return ''
+        return title.url or title.get_canonical_url()
+
+    def get_title(self, language):
+        """
+            Returns the title in the given language, from the translations
+            when they have been loaded
+        """
+        if hasattr(self, 'translations'):
+            for title in self.translations:
+                if title.language == language:
+                    return title
+            raise EntryTitle.DoesNotExist
+        return self.entrytitle_set.get(language=language)
 
     def language_changer(self, language):
         url = self.get_absolute_url(language)
@@ -64,17 +203,33 @@ class Entry(models.Model):
             return url
 
         # There is no entry in the given language, we return blog's root
+        # (or the site's root if the blog app hook is not defined anywhere)
+        return get_blog_root(language) or reverse('pages-root')
 
-        blog_prefix = ''
+    def get_placeholders(self, create=False):
+        """
+            Returns the slot -> placeholder map of the entry, fetched with a
+            single query and kept on the instance (cmsplugin_blog.loaders
+            fills it for a list of entries at once). With create, the
+            placeholders of the configured slots the entry lacks are created.
+        """
+        if not hasattr(self, '_placeholders_cache'):
+            self._placeholders_cache = dict((placeholder.slot, placeholder)
+                for placeholder in self.placeholders.all())
+        if create:
+            missing = [Placeholder.objects.create(slot=slot)
+                for slot in self._meta.get_field('placeholders').placeholders
+                if slot not in self._placeholders_cache]
+            if missing:
+                self.placeholders.add(*missing)
+                self._placeholders_cache.update((placeholder.slot, placeholder) for placeholder in missing)
+        return self._placeholders_cache
 
-        try:
-            title = Title.objects.get(application_urls='BlogApphook', language=language)
-            blog_prefix = urljoin(reverse('pages-root'), title.overwrite_url or title.slug)
-        except Title.DoesNotExist:
-            # Blog app hook not defined anywhere?
-            pass
-
-        return blog_prefix or reverse('pages-root')
+    def get_placeholder(self, slot):
+        """
+            Returns the placeholder for the given slot, or None
+        """
+        return self.get_placeholders().get(slot)
         
     def _template(self):
         from simple_translation.utils import get_translated_model
@@ -89,6 +244,27 @@ class Entry(models.Model):
 
 tagging.register(Entry, tag_descriptor_attr='entry_tags')
 
+class EntryTitleManager(models.Manager):
+
+    def rebuild_urls(self, titles=None):
+        """
+            Stores the canonical URL of the given titles (all titles by
+            default) and returns the number of URLs that changed
+        """
+        if titles is None:
+            titles = self.select_related('entry').iterator()
+        changed = 0
+        for title in titles:
+            url = title.get_canonical_url()
+            if url != title.url:
+                self.filter(pk=title.pk).update(url=url)
+                title.url = url
+                changed += 1
+        if changed:
+            bump_generation()
+            bump_lookup_generation()
+        return changed
+
 class AbstractEntryTitle(models.Model):
     
     DETAIL_TEMPLATE = 'cmsplugin_blog/entry_detail.html'
@@ -98,19 +274,46 @@ class AbstractEntryTitle(models.Model):
     title = models.CharField(_('title'), max_length=255)
     slug = models.SlugField(_('slug'), max_length=255)
     author = models.ForeignKey('auth.User', null=True, blank=True, verbose_name=_("author"))
+    # the canonical path of the detail view, see get_canonical_url
+    url = models.CharField(_('URL'), max_length=255, blank=True, editable=False)
+
+    objects = EntryTitleManager()
     
     def __unicode__(self):
         return self.title
+
+    def save(self, *args, **kwargs):
+        try:
+            self.url = self.get_canonical_url()
+        except NoReverseMatch:
+            # the blog is not hooked into a page yet, the URL is built when needed
+            self.url = ''
+        super(AbstractEntryTitle, self).save(*args, **kwargs)
         
     def _get_absolute_url(self):
-        language_namespace = 'cmsplugin_blog.middleware.MultilingualBlogEntriesMiddleware' in settings.MIDDLEWARE_CLASSES and '%s:' % self.language or ''
+        language_namespace = is_multilingual() and '%s:' % self.language or ''
         return ('%sblog_detail' % language_namespace, (), {
             'year': self.entry.pub_date.strftime('%Y'),
             'month': self.entry.pub_date.strftime('%m'),
             'day': self.entry.pub_date.strftime('%d'),
             'slug': self.slug
         })
-    get_absolute_url = models.permalink(_get_absolute_url)
+    _reverse_absolute_url = models.permalink(_get_absolute_url)
+
+    def get_canonical_url(self):
+        """
+            Returns the path of the detail view as seen from the title's own
+            language, without a language prefix. Stored in ``url`` on save.
+        """
+        current = get_language()
+        activate(self.language)
+        try:
+            return self._reverse_absolute_url()
+        finally:
+            activate(current)
+
+    def get_absolute_url(self):
+        return add_language_prefix(self.url or self.get_canonical_url(), self.language)
 
     class Meta:
         unique_together = ('language', 'slug')
@@ -123,6 +326,256 @@ class EntryTitle(AbstractEntryTitle):
         verbose_name_plural = _('blogentries')
         unique_together = ('language', 'slug')
         
+class EntryListingManager(models.Manager):
+
+    def published(self, language):
+        return self.filter(language=language, **get_published_filter())
+
+    def sync(self, entry):
+        """
+            Brings the listings of an entry in line with the entry and its titles
+        """
+        listings = dict([(listing.language, listing) for listing in self.filter(entry=entry)])
+        for title in entry.entrytitle_set.select_related('author'):
+            title._entry_cache = entry
+            listing = listings.pop(title.language, None) or self.model(entry=entry, language=title.language)
+            listing.update(title)
+            listing.save()
+        for listing in listings.values():
+            listing.delete()
+
+class EntryListing(models.Model):
+    """
+        Denormalized copy of an entry and one of its titles, used to list
+        entries per language when settings.CMSPLUGIN_BLOG_USE_LISTINGS is set
+    """
+    entry = models.ForeignKey(Entry)
+    language = models.CharField(max_length=15)
+    is_published = models.BooleanField()
+    is_visible = models.BooleanField()
+    pub_date = models.DateTimeField()
+    title = models.CharField(max_length=255)
+    slug = models.SlugField(max_length=255, db_index=False)
+    author = models.ForeignKey('auth.User', null=True, blank=True)
+    author_username = models.CharField(max_length=30, blank=True)
+    url = models.CharField(max_length=255)
+    tags = models.CharField(max_length=255, blank=True)
+
+    objects = EntryListingManager()
+
+    def update(self, title):
+        entry = title.entry
+        self.is_published = entry.is_published
+        self.is_visible = entry.is_visible
+        self.pub_date = entry.pub_date
+        self.title = title.title
+        self.slug = title.slug
+        self.author = title.author
+        self.author_username = title.author and title.author.username or ''
+        self.url = title.url or title.get_canonical_url()
+        self.tags = entry.tags
+
+    class Meta:
+        unique_together = ('entry', 'language')
+        ordering = ('-pub_date', )
+
+class EntryTag(models.Model):
+    """
+        Index of the tags of an entry, kept in line with tagging's generic
+        TaggedItem, with the publication fields of the entry copied over
+    """
+    entry = models.ForeignKey(Entry)
+    tag = models.ForeignKey(Tag)
+    is_published = models.BooleanField()
+    is_visible = models.BooleanField()
+    pub_date = models.DateTimeField()
+
+    def update(self, entry):
+        self.is_published = entry.is_published
+        self.is_visible = entry.is_visible
+        self.pub_date = entry.pub_date
+
+    class Meta:
+        unique_together = ('entry', 'tag')
+
+class CountManager(models.Manager):
+
+    def replace(self, queryset, fields, rows):
+        """
+            Replaces the counts selected by queryset with rows of the given
+            field values, identified by the unique fields. Existing counts
+            are updated in place and only the ones gone are deleted, within
+            the transaction of the caller, so they never appear empty. A
+            count created by a concurrent refresh in the meantime is updated.
+        """
+        opts = self.model._meta
+        attnames = [opts.get_field(field).attname for field in fields]
+        existing = dict([(tuple([getattr(count, attname) for attname in attnames]), count)
+            for count in queryset])
+        for row in rows:
+            key = tuple([row[attname] for attname in attnames])
+            values = dict([(name, value) for name, value in row.items() if name not in attnames])
+            count = existing.pop(key, None)
+            if count is not None:
+                if [getattr(count, name) for name in values] != values.values():
+                    self.filter(pk=count.pk).update(**values)
+                continue
+            sid = transaction.savepoint()
+            try:
+                self.create(**row)
+            except IntegrityError:
+                transaction.savepoint_rollback(sid)
+                self.filter(**dict(zip(fields, key))).update(**values)
+            else:
+                transaction.savepoint_commit(sid)
+        if existing:
+            self.filter(pk__in=[count.pk for count in existing.values()]).delete()
+
+class TagCountManager(CountManager):
+
+    def refresh(self, tags):
+        """
+            Recounts the published entries of the given tags (or tag ids) per language
+        """
+        tags = [getattr(tag, 'pk', tag) for tag in tags]
+        if not tags:
+            return
+        counts = EntryTag.objects.filter(tag__in=tags, **get_published_filter()).values(
+            'tag', 'entry__entrytitle__language').annotate(
+            count=Count('entry', distinct=True), last_used=Max('pub_date')).order_by()
+        # entries without titles are not listed anywhere
+        self.replace(self.filter(tag__in=tags), ('tag', 'language'), [{'tag_id': row['tag'],
+            'language': row['entry__entrytitle__language'], 'count': row['count'],
+            'last_used': row['last_used']} for row in counts if row['entry__entrytitle__language'] is not None])
+
+    def cloud(self, language, steps=4, distribution=LOGARITHMIC):
+        """
+            Returns the tags used by published entries in the given
+            language, by name, with their ``count``, ``last_used`` and a
+            ``font_size`` between 1 and steps (see tagging.utils.calculate_cloud)
+        """
+        tags = []
+        for tag_count in self.filter(language=language).select_related('tag').order_by('tag__name'):
+            tag = tag_count.tag
+            tag.count = tag_count.count
+            tag.last_used = tag_count.last_used
+            tags.append(tag)
+        return calculate_cloud(tags, steps, distribution)
+
+class TagCount(models.Model):
+    """
+        Number of published entries per tag and language, kept up to date
+        from the EntryTag index
+    """
+    tag = models.ForeignKey(Tag)
+    language = models.CharField(max_length=15)
+    count = models.PositiveIntegerField(default=0)
+    last_used = models.DateTimeField(null=True)
+
+    objects = TagCountManager()
+
+    class Meta:
+        unique_together = ('language', 'tag')
+
+class MonthArchiveManager(CountManager):
+
+    def refresh(self, dates):
+        """
+            Recounts the published entries per language of the months of the
+            given dates
+        """
+        for year, month in set([(date.year, date.month) for date in dates]):
+            start = datetime.datetime(year, month, 1)
+            end = datetime.datetime(year + month / 12, month % 12 + 1, 1)
+            counts = Entry.objects.filter(pub_date__gte=start, pub_date__lt=end, **get_published_filter()).values(
+                'entrytitle__language').annotate(
+                count=Count('pk', distinct=True), last_pub_date=Max('pub_date')).order_by()
+            self.replace(self.filter(year=year, month=month), ('language', 'year', 'month'), [{'language': row['entrytitle__language'],
+                'year': year, 'month': month, 'count': row['count'], 'last_pub_date': row['last_pub_date']}
+                for row in counts if row['entrytitle__language'] is not None])
+
+    def months(self, language, year=None):
+        """
+            Returns the months with published entries in the given language,
+            oldest first
+        """
+        queryset = self.filter(language=language)
+        if year is not None:
+            queryset = queryset.filter(year=year)
+        return list(queryset.order_by('year', 'month'))
+
+class MonthArchive(models.Model):
+    """
+        Number of published entries and the newest publication date per month
+        and language, kept up to date when entries and titles change
+    """
+    language = models.CharField(max_length=15)
+    year = models.PositiveSmallIntegerField()
+    month = models.PositiveSmallIntegerField()
+    count = models.PositiveIntegerField(default=0)
+    last_pub_date = models.DateTimeField()
+
+    objects = MonthArchiveManager()
+
+    @property
+    def date(self):
+        return datetime.datetime(self.year, self.month, 1)
+
+    class Meta:
+        unique_together = ('language', 'year', 'month')
+
+class AuthorCountManager(CountManager):
+
+    def refresh(self, authors):
+        """
+            Recounts the published entries of the given authors (or author
+            ids) per language
+        """
+        authors = [getattr(author, 'pk', author) for author in authors if author is not None]
+        if not authors:
+            return
+        lookups = dict([('entry__%s' % key, value) for key, value in get_published_filter().items()])
+        counts = EntryTitle.objects.filter(author__in=authors, **lookups).values(
+            'author', 'author__username', 'language').annotate(
+            count=Count('entry', distinct=True), last_pub_date=Max('entry__pub_date')).order_by()
+        self.replace(self.filter(author__in=authors), ('author', 'language'), [{'author_id': row['author'],
+            'username': row['author__username'], 'language': row['language'], 'count': row['count'],
+            'last_pub_date': row['last_pub_date']} for row in counts])
+
+    def directory(self, language, order_by='username'):
+        """
+            Returns the authors of published entries in the given language,
+            ordered by a field of the directory or of the user
+        """
+        field = order_by.lstrip('-')
+        if field not in [f.name for f in self.model._meta.fields]:
+            order_by = order_by.replace(field, 'author__%s' % field)
+        return list(self.filter(language=language).order_by(order_by))
+
+    def author_ids(self, username):
+        """
+            Returns the ids of the authors of published entries with the
+            given username, to select their entries in a subquery without
+            joining the users
+        """
+        return self.filter(username=username).values('author')
+
+class AuthorCount(models.Model):
+    """
+        Number of published entries and the newest publication date per
+        author and language, kept up to date when entries, titles and users change
+    """
+    author = models.ForeignKey('auth.User')
+    username = models.CharField(max_length=30, db_index=True)
+    language = models.CharField(max_length=15)
+    count = models.PositiveIntegerField(default=0)
+    last_pub_date = models.DateTimeField()
+
+    objects = AuthorCountManager()
+
+    class Meta:
+        unique_together = ('language', 'author')
+
 class LatestEntriesPlugin(CMSPlugin):
     """
         Model for the settings when using the latest entries cms plugin
@@ -132,3 +585,173 @@ class LatestEntriesPlugin(CMSPlugin):
                     
     current_language_only = models.BooleanField(_('Only show entries for the current language'))
     tagged = models.CharField(max_length=255, blank=True)
+
+for model in (Entry, EntryTitle, TaggedItem):
+    signals.post_save.connect(bump_generation, sender=model)
+    signals.post_delete.connect(bump_generation, sender=model)
+
+def bump_plugin_generation(sender, instance, **kwargs):
+    # the plugins of pages only change the page around the blog views, not
+    # what the blog caches
+    if instance.placeholder_id and Entry.placeholders.through.objects.filter(
+            placeholder=instance.placeholder_id).exists():
+        bump_generation()
+    else:
+        bump_pages_change()
+
+def connect_plugin_model(sender, **kwargs):
+    # plugin models subclass CMSPlugin, their signals have them as sender
+    if issubclass(sender, CMSPlugin):
+        signals.post_save.connect(bump_plugin_generation, sender=sender)
+        signals.post_delete.connect(bump_plugin_generation, sender=sender)
+
+def get_plugin_models(model=CMSPlugin):
+    plugin_models = [model]
+    for subclass in model.__subclasses__():
+        plugin_models.extend(get_plugin_models(subclass))
+    return plugin_models
+
+# the plugin models loaded so far, and those loaded later
+for model in get_plugin_models():
+    connect_plugin_model(model)
+signals.class_prepared.connect(connect_plugin_model)
+
+def refresh_entry_urls(sender, instance, **kwargs):
+    # the URLs of the titles contain the publication date
+    saved = get_saved_values(instance, 'pub_date')
+    if saved and saved != [instance.pub_date]:
+        titles = list(instance.entrytitle_set.all())
+        for title in titles:
+            title._entry_cache = instance
+        EntryTitle.objects.rebuild_urls(titles)
+
+def sync_entry_listings(sender, instance, **kwargs):
+    if use_listings():
+        EntryListing.objects.sync(instance)
+
+def sync_title_listing(sender, instance, **kwargs):
+    if use_listings():
+        EntryListing.objects.sync(instance.entry)
+
+def delete_title_listing(sender, instance, **kwargs):
+    if use_listings():
+        EntryListing.objects.filter(entry=instance.entry_id, language=instance.language).delete()
+
+def sync_author_listings(sender, instance, **kwargs):
+    if use_listings():
+        EntryListing.objects.filter(author=instance).update(author_username=instance.username)
+
+# before the listings copy the URLs
+signals.post_save.connect(refresh_entry_urls, sender=Entry)
+signals.post_save.connect(sync_entry_listings, sender=Entry)
+signals.post_save.connect(sync_title_listing, sender=EntryTitle)
+signals.post_delete.connect(delete_title_listing, sender=EntryTitle)
+signals.post_save.connect(sync_author_listings, sender=User)
+
+def update_entry_tags(sender, instance, **kwargs):
+    EntryTag.objects.filter(entry=instance).update(is_published=instance.is_published,
+        is_visible=instance.is_visible, pub_date=instance.pub_date)
+
+def is_entry_tag(tagged_item):
+    return tagged_item.content_type_id == ContentType.objects.get_for_model(Entry).pk
+
+def add_entry_tag(sender, instance, created, **kwargs):
+    if created and is_entry_tag(instance):
+        entry = Entry.objects.get(pk=instance.object_id)
+        entry_tag = EntryTag(entry=entry, tag_id=instance.tag_id)
+        entry_tag.update(entry)
+        entry_tag.save()
+        TagCount.objects.refresh([instance.tag_id])
+
+def delete_entry_tag(sender, instance, **kwargs):
+    if is_entry_tag(instance):
+        EntryTag.objects.filter(entry=instance.object_id, tag=instance.tag_id).delete()
+        TagCount.objects.refresh([instance.tag_id])
+
+def refresh_tag_counts(sender, instance, **kwargs):
+    entry_id = isinstance(instance, Entry) and instance.pk or instance.entry_id
+    TagCount.objects.refresh(EntryTag.objects.filter(entry=entry_id).values_list('tag', flat=True))
+
+def collect_entry_tags(sender, instance, **kwargs):
+    # the index rows of the entry are gone once it has been deleted
+    instance._tag_ids = list(EntryTag.objects.filter(entry=instance).values_list('tag', flat=True))
+
+def refresh_deleted_tag_counts(sender, instance, **kwargs):
+    TagCount.objects.refresh(getattr(instance, '_tag_ids', []))
+
+signals.post_save.connect(update_entry_tags, sender=Entry)
+signals.post_save.connect(add_entry_tag, sender=TaggedItem)
+signals.post_delete.connect(delete_entry_tag, sender=TaggedItem)
+signals.post_save.connect(refresh_tag_counts, sender=Entry)
+signals.post_save.connect(refresh_tag_counts, sender=EntryTitle)
+signals.post_delete.connect(refresh_tag_counts, sender=EntryTitle)
+signals.pre_delete.connect(collect_entry_tags, sender=Entry)
+signals.post_delete.connect(refresh_deleted_tag_counts, sender=Entry)
+
+def collect_saved_state(sender, instance, **kwargs):
+    # the month, author or lookup an entry or title is moved out of has to
+    # be refreshed as well
+    saved = instance.pk and list(sender.objects.filter(pk=instance.pk).values()) or []
+    instance._saved_state = saved and saved[0] or None
+
+def get_saved_values(instance, field):
+    saved = getattr(instance, '_saved_state', None)
+    return saved and [saved[field]] or []
+
+def refresh_entry_months(sender, instance, **kwargs):
+    MonthArchive.objects.refresh([instance.pub_date] + get_saved_values(instance, 'pub_date'))
+
+def refresh_title_month(sender, instance, **kwargs):
+    # the entry is gone when its titles are deleted along with it
+    MonthArchive.objects.refresh(Entry.objects.filter(pk=instance.entry_id).values_list('pub_date', flat=True))
+
+signals.pre_save.connect(collect_saved_state, sender=Entry)
+signals.post_save.connect(refresh_entry_months, sender=Entry)
+signals.post_delete.connect(refresh_entry_months, sender=Entry)
+signals.post_save.connect(refresh_title_month, sender=EntryTitle)
+signals.post_delete.connect(refresh_title_month, sender=EntryTitle)
+
+def refresh_entry_authors(sender, instance, **kwargs):
+    AuthorCount.objects.refresh(EntryTitle.objects.filter(entry=instance).values_list('author', flat=True))
+
+def refresh_title_authors(sender, instance, **kwargs):
+    # the previous author loses the entry when the title changes hands
+    AuthorCount.objects.refresh([instance.author_id] + get_saved_values(instance, 'author_id'))
+
+def rename_author(sender, instance, **kwargs):
+    if AuthorCount.objects.filter(author=instance).exclude(username=instance.username).update(
+            username=instance.username):
+        bump_generation()
+
+signals.post_save.connect(refresh_entry_authors, sender=Entry)
+signals.pre_save.connect(collect_saved_state, sender=EntryTitle)
+signals.post_save.connect(refresh_title_authors, sender=EntryTitle)
+signals.post_delete.connect(refresh_title_authors, sender=EntryTitle)
+signals.post_save.connect(rename_author, sender=User)
+
+LOOKUP_FIELDS = {
+    Entry: ('pub_date', 'is_published', 'is_visible'),
+    EntryTitle: ('slug', 'language'),
+}
+
+def bump_changed_lookups(sender, instance, **kwargs):
+    saved = getattr(instance, '_saved_state', None)
+    if not saved or [field for field in LOOKUP_FIELDS[sender] if saved[field] != getattr(instance, field)]:
+        bump_lookup_generation()
+
+for model in (Entry, EntryTitle):
+    signals.post_save.connect(bump_changed_lookups, sender=model)
+    signals.post_delete.connect(bump_lookup_generation, sender=model)
+
+signals.post_save.connect(clear_blog_roots, sender=Title)
+signals.post_delete.connect(clear_blog_roots, sender=Title)
+cms_signals.post_publish.connect(clear_blog_roots)
+cms_signals.page_moved.connect(clear_blog_roots)
+cms_signals.application_post_changed.connect(clear_blog_roots)
+
+# the blog views render the page they are hooked into, with its menu
+for model in (Page, Title):
+    signals.post_save.connect(bump_pages_change, sender=model)
+    signals.post_delete.connect(bump_pages_change, sender=model)
+cms_signals.post_publish.connect(bump_pages_change)
+cms_signals.page_moved.connect(bump_pages_change)
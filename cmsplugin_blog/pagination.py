@@ -0,0 +1,85 @@
+import datetime
+
+from django.db.models import Q
+from django.http import Http404
+
+CURSOR_DATE_FORMAT = '%Y%m%d%H%M%S%f'
+
+def encode_cursor(entry):
+    return '%s-%s' % (entry.pub_date.strftime(CURSOR_DATE_FORMAT), entry.pk)
+
+def decode_cursor(cursor):
+    try:
+        pub_date, pk = cursor.split('-')
+        return datetime.datetime.strptime(pub_date, CURSOR_DATE_FORMAT), int(pk)
+    except ValueError:
+        raise Http404
+
+class CursorPage(object):
+    """
+        A page of entries found by seeking past the (pub_date, id) of the last
+        entry of the neighbouring page, with the interface of a paginator page
+        where it makes sense and links to the neighbouring pages.
+    """
+    def __init__(self, request, object_list, has_next, has_previous):
+        self.request = request
+        self.object_list = object_list
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    def _get_url(self, direction, entry):
+        query = self.request.GET.copy()
+        for key in ('after', 'before', 'page'):
+            query.pop(key, None)
+        query[direction] = encode_cursor(entry)
+        return '%s?%s' % (self.request.path, query.urlencode())
+
+    def next_url(self):
+        if self.has_next():
+            return self._get_url('after', self.object_list[-1])
+
+    def previous_url(self):
+        if self.has_previous():
+            return self._get_url('before', self.object_list[0])
+
+def paginate_by_cursor(request, queryset, per_page):
+    """
+        Returns the CursorPage of newest first entries selected by the
+        ``after`` or ``before`` cursor in the query string. Reads one row more
+        than a page to find out whether there is another one, instead of
+        counting the entries.
+    """
+    before = request.GET.get('before')
+    after = request.GET.get('after')
+    if before:
+        pub_date, pk = decode_cursor(before)
+        queryset = queryset.filter(Q(pub_date__gt=pub_date) | Q(pub_date=pub_date, pk__gt=pk))
+        object_list = list(queryset.order_by('pub_date', 'id')[:per_page + 1])
+        has_previous = len(object_list) > per_page
+        object_list = object_list[:per_page]
+        object_list.reverse()
+        has_next = bool(object_list)
+    else:
+        if after:
+            pub_date, pk = decode_cursor(after)
+            queryset = queryset.filter(Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, pk__lt=pk))
+        object_list = list(queryset.order_by('-pub_date', '-id')[:per_page + 1])
+        has_next = len(object_list) > per_page
+        object_list = object_list[:per_page]
+        has_previous = bool(after)
+    return CursorPage(request, object_list, has_next, has_previous)
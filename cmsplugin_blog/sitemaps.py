@@ -1,12 +1,131 @@
-from django.contrib.sitemaps import Sitemap
-from cmsplugin_blog.models import EntryTitle
+import itertools
+import zlib
+from operator import itemgetter
+
+from django.conf import settings
+from django.contrib.sitemaps import Sitemap, views
+from django.contrib.sites.models import Site, get_current_site
+from django.core.urlresolvers import reverse
+from django.http import HttpResponse
+from django.template import loader
+
+from cmsplugin_blog.cache import cached
+from cmsplugin_blog.models import Entry, EntryTitle, get_published_filter
+from cmsplugin_blog.utils import is_multilingual
+
+SECTION_PREFIX = 'blog-'
 
 class BlogSitemap(Sitemap):
+    """
+        The published entry titles, of all years or of a single one, read
+        as plain values streamed from the database. Every URL lists the
+        titles of its entry in all languages as alternates, rendered by
+        cmsplugin_blog/sitemap.xml. The URLs are the same whatever language
+        the sitemap is requested in: with the multilingual middleware every
+        title is reached through the prefix of its language, as unprefixed
+        URLs are answered in the language negotiated with the visitor.
+    """
     changefreq = "monthly"
     priority = 0.5
 
+    def __init__(self, year=None):
+        self.year = year
+
     def items(self):
-        return EntryTitle.objects.filter(entry__is_published=True)
+        lookups = dict([('entry__%s' % key, value) for key, value in get_published_filter().items()])
+        if self.year is not None:
+            lookups['entry__pub_date__year'] = self.year
+        languages = [code for code, name in settings.LANGUAGES]
+        return EntryTitle.objects.filter(language__in=languages, **lookups).order_by(
+            'entry__pub_date', 'entry__id', 'language').values('entry', 'entry__pub_date', 'language', 'slug', 'url')
+
+    def lastmod(self, item):
+        return item['entry__pub_date']
+
+    def location(self, item):
+        url = item['url']
+        if not url:
+            # not stored yet, see the rebuild_entry_urls command
+            title = EntryTitle(language=item['language'], slug=item['slug'])
+            title._entry_cache = Entry(pub_date=item['entry__pub_date'])
+            url = title.get_canonical_url()
+        if is_multilingual():
+            url = '/%s%s' % (item['language'], url)
+        return url
+
+    def get_urls(self, page=1, site=None):
+        if site is None:
+            site = Site.objects.get_current()
+        page = self.paginator.page(page)
+        domain = 'http://%s' % site.domain
+        entries = [(entry, list(items)) for entry, items in
+            itertools.groupby(page.object_list.iterator(), itemgetter('entry'))]
+        siblings = {}
+        if entries and page.has_other_pages():
+            # the titles of the first and the last entry can continue on the neighbouring pages
+            for item in self.items().filter(entry__in=[entries[0][0], entries[-1][0]]):
+                siblings.setdefault(item['entry'], []).append(item)
+        urls = []
+        for entry, items in entries:
+            alternates = [(item['language'], domain + self.location(item)) for item in siblings.get(entry, items)]
+            for item in items:
+                urls.append({
+                    'location': domain + self.location(item),
+                    'lastmod': self.lastmod(item),
+                    'changefreq': self.changefreq,
+                    'priority': str(self.priority),
+                    'alternates': len(alternates) > 1 and alternates or [],
+                })
+        return urls
+
+def get_sitemaps(sitemaps=None):
+    """
+        Returns the given sitemaps and a BlogSitemap section per year of
+        published entries ('blog-2011', ...)
+    """
+    sitemaps = dict(sitemaps or {})
+    for date in Entry.published.dates('pub_date', 'year'):
+        sitemaps['%s%s' % (SECTION_PREFIX, date.year)] = BlogSitemap(date.year)
+    return sitemaps
+
+def get_section_pages(sitemaps):
+    pages = []
+    for section, site in sorted(sitemaps.items()):
+        if callable(site):
+            site = site()
+        pages.append((section, site.paginator.num_pages))
+    return pages
+
+def index(request, sitemaps=None, template_name='sitemap_index.xml'):
+    """
+        The sitemap index of the given sitemaps and the blog's years, linking
+        to the parts served by the sitemap view. The years of the blog and
+        their number of pages are cached until the blog changes.
+    """
+    current_site = get_current_site(request)
+    protocol = request.is_secure() and 'https' or 'http'
+    pages = get_section_pages(sitemaps or {})
+    pages.extend(cached('sitemap_sections', [], lambda: get_section_pages(get_sitemaps())))
+    locations = []
+    for section, num_pages in pages:
+        url = '%s://%s%s' % (protocol, current_site.domain,
+            reverse('cmsplugin_blog.sitemaps.sitemap', kwargs={'section': section}))
+        locations.append(url)
+        locations.extend(['%s?p=%s' % (url, page) for page in range(2, num_pages + 1)])
+    xml = loader.render_to_string(template_name, {'sitemaps': locations})
+    return HttpResponse(xml, mimetype='application/xml')
 
-    def lastmod(self, obj):
-        return obj.entry.pub_date
\ No newline at end of file
+def sitemap(request, section, sitemaps=None, template_name='cmsplugin_blog/sitemap.xml'):
+    """
+        A part of the sitemap: one of the given sitemaps, or a year of the
+        blog, which is cached until the blog changes
+    """
+    if not section.startswith(SECTION_PREFIX):
+        return views.sitemap(request, sitemaps or {}, section, template_name)
+    def render():
+        response = views.sitemap(request, get_sitemaps(), section, template_name)
+        # the parts of large blogs outgrow the 1MB values memcached accepts
+        # by default, their XML compresses well
+        return zlib.compress(response.content)
+    xml = cached('sitemap', [section, request.GET.get('p', '1')], render)
+    return HttpResponse(zlib.decompress(xml), mimetype='application/xml')
@@ -1,26 +1,29 @@
-import copy, datetime
+import copy
 from django.conf import settings
 from django import template
-from django.contrib.auth import models as auth_models
-
-from tagging.models import Tag
+from django.template.defaultfilters import safe
 
+from cms.plugin_rendering import render_plugins
+from cms.plugins.utils import get_plugins
+from cms.templatetags.placeholder_tags import RenderPlaceholder
 from cms.utils import get_language_from_request
-from cmsplugin_blog.models import Entry, EntryTitle
+from cms.utils.placeholder import get_placeholder_conf
+from cmsplugin_blog import loaders
+from cmsplugin_blog.cache import cached
+from cmsplugin_blog.models import AuthorCount, Entry, EntryTitle, MonthArchive, TagCount
 from cms.models import Placeholder
 
-from simple_translation.translation_pool import translation_pool
-from simple_translation.utils import get_translation_filter_language
-
 register = template.Library()
 
 @register.inclusion_tag('cmsplugin_blog/month_links_snippet.html', takes_context=True)
-def render_month_links(context):
+def render_month_links(context, show_counts=False):
     request = context["request"]
     language = get_language_from_request(request)
-    kw = get_translation_filter_language(Entry, language)
+    months = cached('month_links', [language], lambda: MonthArchive.objects.months(language))
     context.update({
-        'dates': Entry.published.filter(**kw).dates('pub_date', 'month'),
+        'months': months,
+        'dates': [month.date for month in months],
+        'show_counts': show_counts,
     })
     return context
 
@@ -28,10 +31,8 @@ def render_month_links(context):
 def render_tag_links(context):
     request = context["request"]
     language = get_language_from_request(request)
-    kw = get_translation_filter_language(Entry, language)
-    filters = dict(is_published=True, pub_date__lte=datetime.datetime.now(), **kw)
     context.update({
-        'tags': Tag.objects.usage_for_model(Entry, filters=filters)
+        'tags': cached('tag_links', [language], lambda: TagCount.objects.cloud(language))
     })
     return context
 
@@ -39,25 +40,55 @@ def render_tag_links(context):
 def render_author_links(context, order_by='username'):
     request = context["request"]
     language = get_language_from_request(request)
-    info = translation_pool.get_info(Entry)
-    model = info.translated_model
-    kw = get_translation_filter_language(Entry, language)
+    directory = cached('author_links', [language, order_by],
+        lambda: AuthorCount.objects.directory(language, order_by))
     context.update({
-        'authors': auth_models.User.objects.filter(
-            pk__in=model.objects.filter(
-                entry__in=Entry.published.filter(**kw)
-            ).values('author')
-        ).order_by(order_by).values_list('username', flat=True)
+        'directory': directory,
+        'authors': [author.username for author in directory],
     })
     return context
 
 @register.filter
 def choose_placeholder(placeholders, placeholder):
+    entry = getattr(placeholders, 'instance', None)
+    if isinstance(entry, Entry):
+        return entry.get_placeholder(placeholder)
     try:
         return placeholders.get(slot=placeholder)
     except Placeholder.DoesNotExist:
         return None
 
+@register.filter
+def load_entries(entries, request):
+    return loaders.load_entries(entries, request=request)
+
+class RenderEntryPlaceholder(RenderPlaceholder):
+    """
+        Like render_placeholder, but skips looking up the cms page of the
+        placeholder (entry placeholders never belong to a page) outside of
+        edit mode, so rendering a list of entries does not cost a query each.
+    """
+    name = 'render_entry_placeholder'
+
+    def render_tag(self, context, placeholder, width):
+        request = context.get('request', None)
+        if not request or not placeholder:
+            return ''
+        if getattr(getattr(request, 'toolbar', None), 'edit_mode', False):
+            return super(RenderEntryPlaceholder, self).render_tag(context, placeholder, width)
+        context.push()
+        width = width or placeholder.default_width
+        if width:
+            context['width'] = width
+        extra_context = get_placeholder_conf('extra_context', placeholder.slot, None, {})
+        for key, value in extra_context.items():
+            if not key in context:
+                context[key] = value
+        content = ''.join(render_plugins(get_plugins(request, placeholder), context, placeholder))
+        context.pop()
+        return safe(content)
+register.tag(RenderEntryPlaceholder)
+
 
 @register.inclusion_tag('admin/cmsplugin_blog/admin_helpers.html', takes_context=True)
 def admin_helpers(context):
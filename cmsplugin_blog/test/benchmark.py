@@ -0,0 +1,204 @@
+"""
+Seeds a blog and measures every blog URL, the latest entries plugin and the
+sidebar tags: the queries with a cold and a warm cache, the wall time and the
+objects left allocated (containers tracked by the garbage collector, python
+2 has no allocation tracer) of the cold run:
+
+    python -m cmsplugin_blog.test.benchmark [entries [languages [tags [authors [plugins]]]]]
+
+BenchmarkTestCase runs it on a small dataset and fails when a target goes
+over its query budget.
+"""
+import datetime
+import gc
+import sys
+import time
+
+from cmsplugin_blog.test.run_tests import configure
+
+# cold cache queries allowed per target, independent of the number of entries
+# (the cms resolves the page, menu and apphook on every blog URL)
+BUDGETS = {
+    'blog_archive_index': 18,
+    'blog_archive_year': 13,
+    'blog_archive_month': 17,
+    'blog_archive_day': 17,
+    'blog_detail': 17,
+    'blog_archive_tagged': 18,
+    'blog_archive_author': 17,
+    'blog_rss_any_tagged': 15,
+    'blog_rss_tagged': 15,
+    'blog_rss_any_author': 14,
+    'blog_rss_author': 14,
+    'blog_rss_any': 14,
+    'blog_rss': 14,
+    'latest_entries_plugin': 20,
+    'render_month_links': 2,
+    'render_tag_links': 2,
+    'render_author_links': 2,
+}
+
+SIDEBAR_TAGS = ('render_month_links', 'render_tag_links', 'render_author_links')
+
+class Benchmark(object):
+
+    def __init__(self, client, entries=20, languages=2, tags=5, authors=3, plugins=2):
+        from django.conf import settings
+        self.client = client
+        self.entries = entries
+        self.languages = [code for code, name in settings.LANGUAGES][:languages]
+        self.tags = ['tag%s' % i for i in range(tags)]
+        self.authors = authors
+        self.plugins = plugins
+
+    def seed(self, home):
+        """
+            Creates the entries, with a title in every language and the given
+            number of text plugins in each placeholder, and adds the latest
+            entries plugin to the home page
+        """
+        from django.contrib.auth.models import User
+        from cms.api import add_plugin
+        from cmsplugin_blog.models import Entry, EntryTitle
+        authors = [User.objects.create(username='author%s' % i) for i in range(self.authors)]
+        now = datetime.datetime.now()
+        for i in range(self.entries):
+            entry = Entry(is_published=True, pub_date=now - datetime.timedelta(days=i, hours=1),
+                tags=' '.join([self.tags[(i + j) % len(self.tags)] for j in range(2)]))
+            entry.save()
+            for language in self.languages:
+                EntryTitle.objects.create(entry=entry, language=language, title='Entry %s %s' % (i, language),
+                    slug='entry-%s-%s' % (i, language), author=authors[i % len(authors)])
+            for slot in ('excerpt', 'content'):
+                placeholder, created = entry.placeholders.get_or_create(slot=slot)
+                for language in self.languages:
+                    for j in range(self.plugins):
+                        add_plugin(placeholder, 'TextPlugin', language, body='%s %s %s' % (slot, i, j))
+        placeholder, created = home.placeholders.get_or_create(slot='body')
+        add_plugin(placeholder, 'CMSLatestEntriesPlugin', 'en', limit=10, current_language_only=True)
+        self.newest = Entry.published.order_by('-pub_date')[0]
+        self.author = authors[0].username
+
+    def get_targets(self):
+        """
+            Returns (name, callable) pairs for every blog URL, the latest
+            entries plugin and the sidebar tags
+        """
+        from django.core.urlresolvers import reverse
+        from cmsplugin_blog.models import EntryTitle
+        date = self.newest.pub_date
+        date_kwargs = {'year': date.strftime('%Y'), 'month': date.strftime('%m'), 'day': date.strftime('%d')}
+        title = EntryTitle.objects.get(entry=self.newest, language='en')
+        urls = [
+            ('blog_archive_index', {}),
+            ('blog_archive_year', {'year': date_kwargs['year']}),
+            ('blog_archive_month', {'year': date_kwargs['year'], 'month': date_kwargs['month']}),
+            ('blog_archive_day', date_kwargs),
+            ('blog_detail', dict(date_kwargs, slug=title.slug)),
+            ('blog_archive_tagged', {'tag': self.tags[0]}),
+            ('blog_archive_author', {'author': self.author}),
+            ('blog_rss_any_tagged', {'tag': self.tags[0]}),
+            ('blog_rss_tagged', {'tag': self.tags[0]}),
+            ('blog_rss_any_author', {'author': self.author}),
+            ('blog_rss_author', {'author': self.author}),
+            ('blog_rss_any', {}),
+            ('blog_rss', {}),
+        ]
+        targets = [(name, self.get_url_target(reverse('en:%s' % name, kwargs=kwargs)))
+            for name, kwargs in urls]
+        targets.append(('latest_entries_plugin', self.get_url_target('/en/')))
+        targets.extend([(name, self.get_tag_target(name)) for name in SIDEBAR_TAGS])
+        return targets
+
+    def get_url_target(self, url):
+        def target():
+            response = self.client.get(url)
+            assert response.status_code == 200, '%s returned %s' % (url, response.status_code)
+        return target
+
+    def get_tag_target(self, name):
+        from django.template import Context, Template
+        from django.test.client import RequestFactory
+        template = Template('{%% load cmsplugin_blog_tags %%}{%% %s %%}' % name)
+        def target():
+            request = RequestFactory().get('/en/')
+            request.LANGUAGE_CODE = 'en'
+            template.render(Context({'request': request}))
+        return target
+
+    def measure(self, func):
+        """
+            Returns the queries, milliseconds and objects left allocated by func
+        """
+        from django.core.signals import request_started
+        from django.db import connection, reset_queries
+        # the test client resets the query log at the start of each request
+        request_started.disconnect(reset_queries)
+        old_debug_cursor = connection.use_debug_cursor
+        connection.use_debug_cursor = True
+        gc.collect()
+        objects = len(gc.get_objects())
+        start = len(connection.queries)
+        started = time.time()
+        try:
+            func()
+        finally:
+            elapsed = (time.time() - started) * 1000
+            connection.use_debug_cursor = old_debug_cursor
+            request_started.connect(reset_queries)
+        queries = len(connection.queries) - start
+        gc.collect()
+        return queries, elapsed, len(gc.get_objects()) - objects
+
+    def run(self):
+        """
+            Measures every target with a cold cache, then again with a warm
+            one. Returns a list of result dicts.
+        """
+        from django.core.cache import cache
+        results = []
+        for name, target in self.get_targets():
+            cache.clear()
+            queries, elapsed, objects = self.measure(target)
+            warm_queries, warm_elapsed, warm_objects = self.measure(target)
+            results.append({
+                'name': name,
+                'queries': queries,
+                'warm_queries': warm_queries,
+                'ms': elapsed,
+                'warm_ms': warm_elapsed,
+                'objects': objects,
+            })
+        return results
+
+def report(results, stream=sys.stdout):
+    stream.write('%-24s %8s %8s %10s %10s %8s\n' % ('target', 'queries', 'warm', 'ms', 'warm ms', 'objects'))
+    for result in results:
+        stream.write('%(name)-24s %(queries)8d %(warm_queries)8d %(ms)10.1f %(warm_ms)10.1f %(objects)8d\n' % result)
+
+def check_budgets(results, budgets=BUDGETS):
+    """
+        Raises an AssertionError naming every target that ran more queries
+        than its budget
+    """
+    over = ['%s: %s queries, budget %s' % (result['name'], result['queries'], budgets[result['name']])
+        for result in results if result['queries'] > budgets.get(result['name'], sys.maxint)]
+    if over:
+        raise AssertionError('Query budgets exceeded:\n%s' % '\n'.join(over))
+
+def main(*volumes):
+    configure(DATABASES={'default': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': ':memory:'}})
+    from django.core.management import call_command
+    from django.test.client import Client
+    from cmsplugin_blog.test.testcases import create_blog_pages
+    call_command('syncdb', interactive=False, verbosity=0)
+    home, page = create_blog_pages()
+    benchmark = Benchmark(Client(), *volumes)
+    print 'seeding %s entries' % benchmark.entries
+    benchmark.seed(home)
+    results = benchmark.run()
+    report(results)
+    check_budgets(results)
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
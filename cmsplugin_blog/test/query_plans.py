@@ -0,0 +1,109 @@
+"""
+Prints the query plans and timings of the blog's hot queries on a generated
+dataset, before and after adding the indexes of migration 0018:
+
+    python -m cmsplugin_blog.test.query_plans [entries]
+"""
+import datetime
+import sys
+import time
+
+from cmsplugin_blog.test.run_tests import configure
+
+INDEXES = (
+    ('cmsplugin_blog_entry', ('is_published', 'pub_date')),
+    ('cmsplugin_blog_entry', ('is_visible', 'pub_date')),
+    ('cmsplugin_blog_entrytitle', ('language', 'entry_id')),
+    ('cmsplugin_blog_entrytitle', ('author_id', 'language')),
+)
+
+AUTHORS = 50
+
+def seed(count):
+    from django.db import connection, transaction
+    cursor = connection.cursor()
+    cursor.executemany('INSERT INTO auth_user (username, first_name, last_name, email, password, '
+        'is_staff, is_active, is_superuser, last_login, date_joined) '
+        'VALUES (%s, \'\', \'\', \'\', \'\', 0, 1, 0, %s, %s)',
+        [('author%s' % i, datetime.datetime.now(), datetime.datetime.now()) for i in range(AUTHORS)])
+    cursor.execute('SELECT MIN(id) FROM auth_user')
+    first_author = cursor.fetchone()[0]
+    start = datetime.datetime(2000, 1, 1)
+    now = datetime.datetime.now()
+    step = (now - start) / count
+    entries, titles = [], []
+    for i in range(1, count + 1):
+        pub_date = start + step * i
+        # every 50th entry is a draft, the newest are scheduled
+        is_published = i % 50 != 0
+        if i > count - 10:
+            pub_date += datetime.timedelta(days=1)
+        entries.append((i, is_published, is_published and pub_date <= now, pub_date, ''))
+        author = first_author + i % AUTHORS
+        titles.append((i, 'en', 'Entry %s' % i, 'entry-%s' % i, author))
+        if i % 2:
+            titles.append((i, 'de', 'Eintrag %s' % i, 'eintrag-%s' % i, author))
+    cursor.executemany('INSERT INTO cmsplugin_blog_entry (id, is_published, is_visible, pub_date, tags) '
+        'VALUES (%s, %s, %s, %s, %s)', entries)
+    cursor.executemany('INSERT INTO cmsplugin_blog_entrytitle (entry_id, language, title, slug, author_id) '
+        'VALUES (%s, %s, %s, %s, %s)', titles)
+    transaction.commit_unless_managed()
+    return entries[count / 2][3]
+
+def get_queries(sample_date):
+    from cmsplugin_blog.models import Entry
+    day = datetime.datetime.combine(sample_date.date(), datetime.time())
+    return (
+        ('archive index', Entry.published.filter(entrytitle__language='en').distinct()[:15]),
+        ('archive index (visible flag)', Entry.objects.filter(is_visible=True, entrytitle__language='en').distinct()[:15]),
+        ('archive month', Entry.published.filter(entrytitle__language='en',
+            pub_date__range=(day.replace(day=1), day.replace(day=1) + datetime.timedelta(days=31))).distinct()),
+        ('month links', Entry.published.filter(entrytitle__language='en').dates('pub_date', 'month')),
+        ('detail', Entry.published.filter(entrytitle__language='en', entrytitle__slug='entry-1',
+            pub_date__range=(day, day + datetime.timedelta(days=1)))),
+        ('author archive', Entry.published.filter(entrytitle__author__username='author7',
+            entrytitle__language='en').distinct()[:15]),
+    )
+
+def explain(name, queryset):
+    from django.db import connection
+    sql, params = queryset.query.get_compiler(queryset.db).as_sql()
+    cursor = connection.cursor()
+    explain = connection.vendor == 'sqlite' and 'EXPLAIN QUERY PLAN ' or 'EXPLAIN '
+    cursor.execute(explain + sql, params)
+    plan = cursor.fetchall()
+    started = time.time()
+    cursor.execute(sql, params)
+    cursor.fetchall()
+    elapsed = (time.time() - started) * 1000
+    print '%s: %.1f ms' % (name, elapsed)
+    for row in plan:
+        print '    %s' % ' '.join([unicode(column) for column in row])
+
+def create_indexes():
+    from django.db import connection, transaction
+    cursor = connection.cursor()
+    for table, columns in INDEXES:
+        cursor.execute('CREATE INDEX %s ON %s (%s)' % (
+            '%s_%s' % (table, '_'.join(columns)), table, ', '.join(columns)))
+    if connection.vendor in ('sqlite', 'postgresql'):
+        cursor.execute('ANALYZE')
+    transaction.commit_unless_managed()
+
+def main(count=500000):
+    configure(DATABASES={'default': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': ':memory:'}})
+    from django.core.management import call_command
+    call_command('syncdb', interactive=False, verbosity=0)
+    print 'seeding %s entries' % count
+    sample_date = seed(count)
+    queries = get_queries(sample_date)
+    print '\n== without indexes\n'
+    for name, queryset in queries:
+        explain(name, queryset)
+    create_indexes()
+    print '\n== with indexes\n'
+    for name, queryset in queries:
+        explain(name, queryset)
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
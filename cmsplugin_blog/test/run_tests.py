@@ -9,6 +9,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.admin',
     'django.contrib.sites',        
+    'django.contrib.sitemaps',
     'cms',
     'cms.plugins.text',
     'mptt',
@@ -50,11 +51,11 @@ else:
     INSTALLED_APPS.append('django.contrib.staticfiles')
     TEMPLATE_CONTEXT_PROCESSORS.append('django.core.context_processors.static')
     
-def run_tests():
+def configure(**overrides):
     
     from django.conf import settings
     
-    settings.configure(
+    options = dict(
         INSTALLED_APPS=INSTALLED_APPS,
         MIDDLEWARE_CLASSES = MIDDLEWARE_CLASSES,
         TEMPLATE_CONTEXT_PROCESSORS = TEMPLATE_CONTEXT_PROCESSORS,
@@ -79,6 +80,13 @@ def run_tests():
         TEST_RUNNER = 'xmlrunner.extra.djangotestrunner.XMLTestRunner',
         TEST_OUTPUT_VERBOSE = True
     )
+    options.update(overrides)
+    settings.configure(**options)
+    return settings
+    
+def run_tests():
+    
+    settings = configure()
     
     from django.test.utils import get_runner
 
@@ -16,5 +16,7 @@ urlpatterns += patterns('',
             'blogentries': BlogSitemap
         }
     }),
+    url(r'^sitemap-index\.xml$', 'cmsplugin_blog.sitemaps.index'),
+    url(r'^sitemap-(?P<section>.+)\.xml$', 'cmsplugin_blog.sitemaps.sitemap'),
     url(r'^', include('cms.urls'))
 )
@@ -1,39 +1,53 @@
 from django.core.urlresolvers import reverse
 from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.signals import request_started
+from django.db import connection, reset_queries
 from django.template.defaultfilters import slugify
 
 from cms.test_utils.testcases import CMSTestCase
 from cms.models.titlemodels import Title
-from cms.api import create_page
+from cms.api import create_page, add_plugin
 
 from simple_translation.utils import get_translation_manager
 
+from cmsplugin_blog.cache import lookups
 from cmsplugin_blog.models import Entry
 
+def create_blog_pages():
+    """
+        Creates the home page and the blog page below it, hooked up in all
+        test languages. Returns both.
+    """
+    superuser = User.objects.create_superuser('admin', 'admin@admin.com', 'admin')
+    home = create_page('home', 'nav_playground.html', 'en', published=True, created_by=superuser)
+    page = create_page( 'test-page-1', 'nav_playground.html', 'en', parent=home, published=True, created_by=superuser)
+    english_title = page.title_set.all()[0]
+    Title.objects.create(
+        language='de',
+        title='%s DE' % english_title.title,
+        slug=english_title.slug,
+        path=english_title.path,
+        page=page
+    )
+    Title.objects.create(
+        language='nb',
+        title='%s NB' % english_title.title,
+        slug=english_title.slug,
+        path=english_title.path,
+        page=page
+    )
+    page.title_set.all().update(application_urls='BlogApphook')
+    reverse('en:blog_archive_index') # fill cache
+    return home, page
+
 class BaseBlogTestCase(CMSTestCase):
 
     def setUp(self):
-        superuser = User.objects.create_superuser('admin', 'admin@admin.com', 'admin')
-        home = create_page('home', 'nav_playground.html', 'en', published=True, created_by=superuser)
-        page = create_page( 'test-page-1', 'nav_playground.html', 'en', parent=home, published=True, created_by=superuser)
-        english_title = page.title_set.all()[0]
-        self.assertEquals(english_title.language, 'en')
-        Title.objects.create(
-            language='de',
-            title='%s DE' % english_title.title,
-            slug=english_title.slug,
-            path=english_title.path,
-            page=page
-        )
-        Title.objects.create(
-            language='nb',
-            title='%s NB' % english_title.title,
-            slug=english_title.slug,
-            path=english_title.path,
-            page=page
-        )
-        page.title_set.all().update(application_urls='BlogApphook')
-        reverse('en:blog_archive_index') # fill cache
+        cache.clear()
+        lookups.clear()
+        home, page = create_blog_pages()
+        self.assertEquals(page.title_set.get(language='en').application_urls, 'BlogApphook')
         
     def create_entry_with_title(self, title=None, slug=None, language=None, published=False, published_at=None, author=None, **kwargs):
         entry_kwargs = {'is_published': published}
@@ -48,4 +62,21 @@ class BaseBlogTestCase(CMSTestCase):
             title = 'Entry title'
         slug = slug or slugify(title)
         language = language or 'en'
-        return get_translation_manager(entry).create(entry=entry, title=title, slug=slug, language=language, author=author, **kwargs)
\ No newline at end of file
+        return get_translation_manager(entry).create(entry=entry, title=title, slug=slug, language=language, author=author, **kwargs)
+
+    def add_text_plugin(self, entry, slot='excerpt', language='en', body='Excerpt'):
+        placeholder, created = entry.placeholders.get_or_create(slot=slot)
+        return add_plugin(placeholder, 'TextPlugin', language, body=body)
+
+    def count_queries(self, func, *args, **kwargs):
+        # the test client resets the query log at the start of each request
+        request_started.disconnect(reset_queries)
+        old_debug_cursor = connection.use_debug_cursor
+        connection.use_debug_cursor = True
+        start = len(connection.queries)
+        try:
+            func(*args, **kwargs)
+        finally:
+            connection.use_debug_cursor = old_debug_cursor
+            request_started.connect(reset_queries)
+        return len(connection.queries) - start
\ No newline at end of file
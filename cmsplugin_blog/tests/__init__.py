@@ -6,8 +6,9 @@ from django.contrib.auth.models import User
 from django.http import Http404
 from django.db import connection
 from cms.models.placeholdermodel import Placeholder
+from tagging.models import Tag
 
-from cmsplugin_blog.models import Entry, LatestEntriesPlugin
+from cmsplugin_blog.models import Entry, EntryTitle, LatestEntriesPlugin
 from cmsplugin_blog.test.testcases import BaseBlogTestCase
 
 class NULL:
@@ -142,6 +143,117 @@ class BlogTestCase(BaseBlogTestCase):
         changelist_url = reverse('admin:cmsplugin_blog_entry_changelist')
         response = self.client.get(changelist_url)
         self.assertEquals(response.status_code, 200)
+
+    def test_07_admin_changelist_queries(self):
+        superuser = User(username="super", is_staff=True, is_active=True, is_superuser=True)
+        superuser.set_password("super")
+        superuser.save()
+        self.client.login(username='super', password='super')
+        changelist_url = reverse('admin:cmsplugin_blog_entry_changelist')
+        published_at = datetime.datetime.now() - datetime.timedelta(hours=1)
+        title, entry = self.create_entry_with_title(published=True, published_at=published_at,
+            title='first title', author=superuser)
+        self.client.get(changelist_url)
+        queries = self.count_queries(self.client.get, changelist_url)
+        for i in range(5):
+            title, entry = self.create_entry_with_title(published=True, published_at=published_at,
+                title='title %s' % i, author=superuser)
+            self.create_entry_title(entry, title='Titel %s' % i, language='de')
+        self.assertEquals(self.count_queries(self.client.get, changelist_url), queries)
+        response = self.client.get(changelist_url)
+        self.assertContains(response, 'title 4')
+        self.assertContains(response, '>DE</a>', 5)
+        # sorted by the title column
+        response = self.client.get(changelist_url, {'o': '1', 'ot': 'desc'})
+        self.assertEquals(response.status_code, 200)
+        content = response.content
+        self.assertTrue(content.index('title 4') < content.index('title 0') < content.index('first title'))
+        # the title of an entry translated to German first is the German one
+        german = Entry.objects.create(is_published=True, pub_date=published_at + datetime.timedelta(minutes=1))
+        self.create_entry_title(german, title='Deutscher Titel', language='de')
+        self.create_entry_title(german, title='english title', language='en')
+        response = self.client.get(changelist_url)
+        self.assertContains(response, 'Deutscher Titel')
+        self.assertNotContains(response, 'english title')
+
+    def test_08_tag_autocomplete(self):
+        from django.utils import simplejson
+        from cmsplugin_blog import admin as blog_admin
+        superuser = User(username="super", is_staff=True, is_active=True, is_superuser=True)
+        superuser.set_password("super")
+        superuser.save()
+        self.client.login(username='super', password='super')
+        for tags in ('django python', 'django', 'djangocms'):
+            title, entry = self.create_entry_with_title(published=False, title=tags)
+            entry.tags = tags
+            entry.save()
+        url = reverse('admin:cmsplugin_blog_entry_tags')
+        def get_tags(**params):
+            return simplejson.loads(self.client.get(url, params).content)
+        self.assertEquals(get_tags(), {'tags': ['django', 'djangocms', 'python'], 'has_more': False})
+        self.assertEquals(get_tags(term='Djan')['tags'], ['django', 'djangocms'])
+        old_limit = blog_admin.TAG_AUTOCOMPLETE_LIMIT
+        blog_admin.TAG_AUTOCOMPLETE_LIMIT = 1
+        try:
+            self.assertEquals(get_tags(term='djan'), {'tags': ['django'], 'has_more': True})
+            self.assertEquals(get_tags(term='djan', page=2), {'tags': ['djangocms'], 'has_more': False})
+        finally:
+            blog_admin.TAG_AUTOCOMPLETE_LIMIT = old_limit
+        response = self.client.get(reverse('admin:cmsplugin_blog_entry_change', args=(entry.pk,)))
+        self.assertContains(response, url)
+        self.assertNotContains(response, 'python')
+        # outside of the admin there is nothing to fetch suggestions from
+        from cmsplugin_blog.widgets import AutoCompleteTagInput
+        self.assertFalse('<script' in AutoCompleteTagInput().render('tags', 'django'))
+
+    def test_09_move_plugins(self):
+        from cms.models import CMSPlugin
+        superuser = User(username="super", is_staff=True, is_active=True, is_superuser=True)
+        superuser.set_password("super")
+        superuser.save()
+        self.client.login(username='super', password='super')
+        title, entry = self.create_entry_with_title()
+        url = reverse('admin:cmsplugin_blog_entry_move_plugin')
+        def move(plugins):
+            ids = '_'.join([str(plugin.pk) for plugin in plugins])
+            return self.client.post(url, {'ids': ids}).content
+        def get_order(placeholder):
+            return list(CMSPlugin.objects.filter(placeholder=placeholder).order_by('position').values_list('pk', flat=True))
+        plugins = [self.add_text_plugin(entry, body='plugin %s' % i) for i in range(3)]
+        placeholder = plugins[0].placeholder
+        self.client.post(url, {'ids': '_'.join([str(plugin.pk) for plugin in plugins])})
+        queries = self.count_queries(move, plugins[::-1])
+        self.assertEquals(get_order(placeholder), [plugin.pk for plugin in plugins[::-1]])
+        plugins.extend([self.add_text_plugin(entry, body='plugin %s' % i) for i in range(3, 9)])
+        self.assertEquals(self.count_queries(move, plugins), queries)
+        self.assertEquals(get_order(placeholder), [plugin.pk for plugin in plugins])
+        # plugins of other placeholders or objects are left alone
+        other = self.add_text_plugin(entry, slot='content')
+        self.assertEquals(move([other] + plugins[1:]), 'error')
+        from cms.api import add_plugin
+        foreign = add_plugin(Placeholder.objects.create(slot='body'), 'TextPlugin', 'en', body='foreign')
+        self.assertEquals(move([foreign]), 'error')
+        self.assertEquals(get_order(placeholder), [plugin.pk for plugin in plugins])
+
+    def test_10_change_form_placeholders(self):
+        superuser = User(username="super", is_staff=True, is_active=True, is_superuser=True)
+        superuser.set_password("super")
+        superuser.save()
+        self.client.login(username='super', password='super')
+        title, entry = self.create_entry_with_title()
+        self.add_text_plugin(entry, slot='excerpt')
+        url = reverse('admin:cmsplugin_blog_entry_change', args=(entry.pk,))
+        self.assertEquals(self.client.get(url).status_code, 200)
+        self.assertEquals(sorted(entry.placeholders.values_list('slot', flat=True)), ['content', 'excerpt'])
+        connection.use_debug_cursor = True
+        try:
+            self.client.get(url)
+            self.assertEquals(len([query for query in connection.queries
+                if 'FROM "cms_placeholder"' in query['sql'] and 'cmsplugin_blog_entry_placeholders' in query['sql']]), 1)
+            self.assertFalse([query for query in connection.queries if 'INSERT' in query['sql']])
+        finally:
+            connection.use_debug_cursor = False
+        self.assertEquals(entry.placeholders.count(), 2)
                 
 class BlogRSSTestCase(BaseBlogTestCase):
     
@@ -183,6 +295,8 @@ class BlogRSSTestCase(BaseBlogTestCase):
         published_at = datetime.datetime.now() - datetime.timedelta(hours=1)
         title, entry = self.create_entry_with_title(published=True, 
             published_at=published_at)
+        entry.tags = 'test'
+        entry.save()
         response = self.client.get(reverse('en:blog_rss_tagged', kwargs={'tag': 'test'}))
         self.assertEquals(response.status_code, 200)
         self.assertContains(response, 'in English')  
@@ -191,6 +305,8 @@ class BlogRSSTestCase(BaseBlogTestCase):
         published_at = datetime.datetime.now() - datetime.timedelta(hours=1)
         title, entry = self.create_entry_with_title(published=True, 
             published_at=published_at)
+        entry.tags = 'test'
+        entry.save()
         response = self.client.get(reverse('en:blog_rss_any_tagged', kwargs={'tag': 'test'}))
         self.assertEquals(response.status_code, 200)
         self.assertNotContains(response, 'in English') 
@@ -287,7 +403,103 @@ class LanguageChangerTestCase(BaseBlogTestCase):
         self.assertEquals(entry.language_changer('de'), u'/test-page-1/2011/08/31/german/')
         self.assertEquals(entry.language_changer('nb'), u'/test-page-1/')
         self.assertEquals(entry.language_changer('nn'), u'/')
+
+    def test_02_blog_roots(self):
+        from cms.models import Title
+        published_at = datetime.datetime(2011, 8, 31, 11, 0)
+        title, entry = self.create_entry_with_title(published=True, published_at=published_at)
+        entry.language_changer('de')
+        # the roots of all languages are looked up once per process
+        self.assertEquals(self.count_queries(lambda: [entry.language_changer(language)
+            for language in ('de', 'nb', 'nn')]), 3)
+        self.assertEquals(entry.language_changer('nb'), u'/test-page-1/')
+        nb_title = Title.objects.get(application_urls='BlogApphook', language='nb')
+        nb_title.slug = 'blogg'
+        nb_title.save()
+        self.assertEquals(entry.language_changer('nb'), u'/blogg/')
+        # the roots another process keeps are outdated by the shared generation
+        from cmsplugin_blog import utils
+        other_process = utils._blog_roots
+        nb_title.slug = 'blog'
+        nb_title.save()
+        utils._blog_roots = other_process
+        self.assertEquals(entry.language_changer('nb'), u'/blog/')
         
+class DetailViewTestCase(BaseBlogTestCase):
+
+    def test_01_single_lookup(self):
+        published_at = datetime.datetime(2011, 8, 31, 11, 0)
+        title, entry = self.create_entry_with_title(published=True, published_at=published_at)
+        self.create_entry_title(entry, title='german', language='de')
+        self.add_text_plugin(entry, slot='content', body='the content')
+        url = reverse('en:blog_detail', kwargs={'year': '2011', 'month': '08', 'day': '31', 'slug': title.slug})
+        self.client.get(url)
+        connection.use_debug_cursor = True
+        try:
+            response = self.client.get(url)
+            self.assertContains(response, 'the content')
+            self.assertEquals(len([query for query in connection.queries
+                if 'cmsplugin_blog_entrytitle' in query['sql']]), 1)
+        finally:
+            connection.use_debug_cursor = False
+
+    def test_02_fallback(self):
+        published_at = datetime.datetime(2011, 8, 31, 11, 0)
+        title, entry = self.create_entry_with_title(published=True, published_at=published_at,
+            language='de', slug='entry-title')
+        self.create_entry_title(entry, title='norsk', language='nb')
+        with SettingsOverride(DEBUG=True):
+            self.client.get(u'/en/')
+            response = self.client.get(u'/test-page-1/2011/08/31/entry-title/')
+            self.assertRedirects(response, u'/de/test-page-1/2011/08/31/entry-title/')
+            self.client.get(u'/en/')
+            response = self.client.get(u'/test-page-1/2011/08/31/norsk/')
+            self.assertRedirects(response, u'/nb/test-page-1/2011/08/31/norsk/')
+            response = self.client.get(u'/test-page-1/2011/08/30/entry-title/')
+            self.assertEqual(response.status_code, 404)
+
+    def test_03_unpublished(self):
+        published_at = datetime.datetime(2011, 8, 31, 11, 0)
+        title, entry = self.create_entry_with_title(published=False, published_at=published_at)
+        url = reverse('en:blog_detail', kwargs={'year': '2011', 'month': '08', 'day': '31', 'slug': title.slug})
+        with SettingsOverride(DEBUG=True):
+            self.assertEqual(self.client.get(url).status_code, 404)
+            self.client.login(username='admin', password='admin')
+            self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_04_lookup_cache(self):
+        def get_detail(slug, day='31'):
+            url = reverse('en:blog_detail', kwargs={'year': '2011', 'month': '08', 'day': day, 'slug': slug})
+            connection.use_debug_cursor = True
+            try:
+                status_code = self.client.get(url).status_code
+                lookups = [query for query in connection.queries if 'BETWEEN' in query['sql']]
+            finally:
+                connection.use_debug_cursor = False
+            return status_code, len(lookups)
+        with SettingsOverride(DEBUG=True):
+            self.assertEquals(get_detail('entry-title'), (404, 1))
+            # bots probing missing entries are answered from the cache
+            self.assertEquals(get_detail('entry-title'), (404, 0))
+            title, entry = self.create_entry_with_title(published=True,
+                published_at=datetime.datetime(2011, 8, 31, 11, 0))
+            self.assertEquals(get_detail('entry-title'), (200, 1))
+            self.assertEquals(get_detail('entry-title'), (200, 0))
+            title.title = 'changed title'
+            title.save()
+            self.assertEquals(get_detail('entry-title'), (200, 0))
+            title.slug = 'changed-title'
+            title.save()
+            self.assertEquals(get_detail('entry-title'), (404, 1))
+            self.assertEquals(get_detail('changed-title'), (200, 1))
+            entry.pub_date = datetime.datetime(2011, 8, 30, 11, 0)
+            entry.save()
+            self.assertEquals(get_detail('changed-title'), (404, 1))
+            self.assertEquals(get_detail('changed-title', day='30'), (200, 1))
+            entry.is_published = False
+            entry.save()
+            self.assertEquals(get_detail('changed-title', day='30'), (404, 1))
+
 class RedirectTestCase(BaseBlogTestCase):
     
     def test_01_redirect_existing_language(self):
@@ -344,7 +556,754 @@ class LatestEntriesTestCase(BaseBlogTestCase):
         self.assertEquals(plugin.render_plugin({'request': r}).count('english title'), 1)
         self.assertEquals(plugin.render_plugin({'request': r}).count('german title'), 1)
 
+    def test_02_cached_rendering(self):
+        class MockRequest(object):
+            LANGUAGE_CODE = 'en'
+            REQUEST = {}
+        r = MockRequest()
+        published_at = datetime.datetime.now() - datetime.timedelta(hours=1)
+        title, entry = self.create_entry_with_title(published=True, 
+            published_at=published_at, title='tagged title')
+        entry.tags = 'django'
+        entry.save()
+        ph = Placeholder(slot='main')
+        ph.save()
+        plugin = LatestEntriesPlugin(placeholder=ph, plugin_type='CMSLatestEntriesPlugin', limit=2,
+            current_language_only=True, tagged='django')
+        plugin.insert_at(None, position='last-child', save=False)
+        plugin.save()
+        self.assertEquals(plugin.render_plugin({'request': r}).count('tagged title'), 1)
+        def blog_queries():
+            start = len(connection.queries)
+            plugin.render_plugin({'request': MockRequest()})
+            return [query for query in connection.queries[start:] if 'cmsplugin_blog' in query['sql']]
+        connection.use_debug_cursor = True
+        try:
+            self.assertEquals(blog_queries(), [])
+            entry.tags = ''
+            entry.save()
+            self.assertNotEquals(blog_queries(), [])
+        finally:
+            connection.use_debug_cursor = False
+        self.assertEquals(plugin.render_plugin({'request': MockRequest()}).count('tagged title'), 0)
+
         
+    def test_03_batch(self):
+        class MockRequest(object):
+            LANGUAGE_CODE = 'en'
+            REQUEST = {}
+        r = MockRequest()
+        published_at = datetime.datetime.now() - datetime.timedelta(hours=1)
+        for i, tags in enumerate(('django', 'python', 'django python')):
+            title, entry = self.create_entry_with_title(published=True, title='title %s' % i,
+                published_at=published_at - datetime.timedelta(days=i))
+            entry.tags = tags
+            entry.save()
+        ph = Placeholder(slot='main')
+        ph.save()
+        plugins = []
+        for tagged, limit in (('django', 5), ('python', 1), ('', 2), ('missing', 5)):
+            plugin = LatestEntriesPlugin(placeholder=ph, plugin_type='CMSLatestEntriesPlugin', limit=limit,
+                current_language_only=True, tagged=tagged, language='en')
+            plugin.insert_at(None, position='last-child', save=False)
+            plugin.save()
+            plugins.append(plugin)
+        connection.use_debug_cursor = True
+        try:
+            start = len(connection.queries)
+            contents = [plugins[0].render_plugin({'request': r})]
+            first = len(connection.queries)
+            contents.extend([plugin.render_plugin({'request': r}) for plugin in plugins[1:]])
+            rest = [query for query in connection.queries[first:] if 'cmsplugin_blog' in query['sql']]
+        finally:
+            connection.use_debug_cursor = False
+        self.assertEquals(len([query for query in connection.queries[start:first] if 'UNION' in query['sql']]), 1)
+        self.assertEquals(rest, [])
+        self.assertTrue(contents[0].index('title 0') < contents[0].index('title 2'))
+        self.assertFalse('title 1' in contents[0])
+        self.assertTrue('title 1' in contents[1] and not 'title 2' in contents[1])
+        self.assertTrue('title 0' in contents[2] and 'title 1' in contents[2] and not 'title 2' in contents[2])
+        self.assertFalse('title' in contents[3])
+
+class LoadEntriesTestCase(BaseBlogTestCase):
+
+    def create_entries(self, count, offset=0):
+        for i in range(offset, offset + count):
+            published_at = datetime.datetime(2011, 8, 30, 11, 0) - datetime.timedelta(days=i)
+            title, entry = self.create_entry_with_title(published=True, published_at=published_at,
+                title='entry %s' % i)
+            self.create_entry_title(entry, title='german %s' % i, language='de')
+            self.add_text_plugin(entry, body='excerpt %s' % i)
+
+    def test_01_archive_index_query_count(self):
+        url = reverse('en:blog_archive_index')
+        self.create_entries(2)
+        self.client.get(url)
+        queries = self.count_queries(self.client.get, url)
+        self.create_entries(4, offset=2)
+        self.client.get(url)
+        self.assertEquals(self.count_queries(self.client.get, url), queries)
+        response = self.client.get(url)
+        for i in range(6):
+            self.assertContains(response, 'excerpt %s' % i)
+            self.assertContains(response, '/test-page-1/2011/08/%02d/entry-%s/' % (30 - i, i))
+
+    def test_02_feed_query_count(self):
+        from django.core.cache import cache
+        url = reverse('en:blog_rss')
+        self.create_entries(2)
+        self.client.get(url)
+        # the feed document itself is cached, count the queries to render it
+        cache.clear()
+        queries = self.count_queries(self.client.get, url)
+        self.create_entries(4, offset=2)
+        self.client.get(url)
+        cache.clear()
+        self.assertEquals(self.count_queries(self.client.get, url), queries)
+        self.assertContains(self.client.get(url), 'excerpt 5')
+
+class SidebarCacheTestCase(BaseBlogTestCase):
+
+    def render_sidebar(self):
+        from cmsplugin_blog.templatetags.cmsplugin_blog_tags import render_month_links, render_tag_links, render_author_links
+        class MockRequest(object):
+            LANGUAGE_CODE = 'en'
+            REQUEST = {}
+        context = {'request': MockRequest()}
+        return (list(render_month_links(context)['dates']),
+            [tag.name for tag in render_tag_links(context)['tags']],
+            list(render_author_links(context)['authors']))
+
+    def test_01_warm_cache(self):
+        user = User.objects.all()[0]
+        published_at = datetime.datetime(2011, 8, 30, 11, 0)
+        title, entry = self.create_entry_with_title(published=True,
+            published_at=published_at, author=user)
+        entry.tags = 'test'
+        entry.save()
+        self.assertEquals(self.render_sidebar(), ([datetime.datetime(2011, 8, 1)], ['test'], [user.username]))
+        self.assertEquals(self.count_queries(self.render_sidebar), 0)
+
+    def test_02_invalidation(self):
+        published_at = datetime.datetime(2011, 8, 30, 11, 0)
+        title, entry = self.create_entry_with_title(published=True,
+            published_at=published_at)
+        entry.tags = 'test'
+        entry.save()
+        self.render_sidebar()
+        entry.tags = 'test, other'
+        entry.save()
+        self.assertEquals(self.render_sidebar()[1], ['other', 'test'])
+        june_title, june_entry = self.create_entry_with_title(published=True,
+            published_at=datetime.datetime(2011, 6, 30, 11, 0), slug='june')
+        self.assertEquals(len(self.render_sidebar()[0]), 2)
+        june_entry.delete()
+        self.assertEquals(len(self.render_sidebar()[0]), 1)
+        self.assertEquals(self.render_sidebar()[2], [])
+        title.author = User.objects.all()[0]
+        title.save()
+        self.assertEquals(self.render_sidebar()[2], [title.author.username])
+
+class PublicationBoundaryTestCase(BaseBlogTestCase):
+
+    def test_01_boundary(self):
+        from cmsplugin_blog.models import get_publication_boundary, get_publication_time
+        now = datetime.datetime(2011, 8, 30, 11, 17, 42, 1234)
+        self.assertEquals(get_publication_boundary(now), datetime.datetime(2011, 8, 30, 11, 17))
+        self.assertEquals(get_publication_time(now), datetime.datetime(2011, 8, 30, 11, 18))
+        self.assertEquals(get_publication_time(datetime.datetime(2011, 8, 30, 11, 18)), datetime.datetime(2011, 8, 30, 11, 18))
+        import cmsplugin_blog.models
+        old_granularity = cmsplugin_blog.models.CMSPLUGIN_BLOG_PUBLICATION_GRANULARITY
+        cmsplugin_blog.models.CMSPLUGIN_BLOG_PUBLICATION_GRANULARITY = 3600
+        try:
+            self.assertEquals(get_publication_boundary(now), datetime.datetime(2011, 8, 30, 11, 0))
+        finally:
+            cmsplugin_blog.models.CMSPLUGIN_BLOG_PUBLICATION_GRANULARITY = old_granularity
+
+    def test_02_next_publication(self):
+        from cmsplugin_blog.cache import get_timeout, CMSPLUGIN_BLOG_CACHE_TIMEOUT
+        from cmsplugin_blog.models import get_publication_time
+        self.assertEquals(Entry.objects.next_publication(), None)
+        self.assertEquals(get_timeout(), CMSPLUGIN_BLOG_CACHE_TIMEOUT)
+        self.create_entry_with_title(published=True,
+            published_at=datetime.datetime.now() - datetime.timedelta(hours=1), slug='past')
+        self.create_entry_with_title(published=False,
+            published_at=datetime.datetime.now() + datetime.timedelta(hours=1), slug='draft')
+        self.assertEquals(Entry.objects.next_publication(), None)
+        published_at = datetime.datetime.now() + datetime.timedelta(hours=2)
+        self.create_entry_with_title(published=True, published_at=published_at, slug='scheduled')
+        self.assertEquals(Entry.objects.next_publication(), get_publication_time(published_at))
+        self.assertTrue(get_timeout() <= 2 * 60 * 60 + 60)
+        self.assertEquals(Entry.published.count(), 1)
+
+class SchedulerTestCase(BaseBlogTestCase):
+
+    def test_01_publish_scheduled(self):
+        from django.core.management import call_command
+        from django.db.models import signals
+        published_at = datetime.datetime.now() + datetime.timedelta(hours=1)
+        title, entry = self.create_entry_with_title(published=True, published_at=published_at)
+        draft_title, draft = self.create_entry_with_title(published=False,
+            published_at=published_at, slug='draft')
+        self.assertFalse(Entry.objects.get(pk=entry.pk).is_visible)
+        # time passes
+        Entry.objects.update(pub_date=datetime.datetime.now() - datetime.timedelta(hours=1))
+        saved = []
+        def on_save(sender, instance, **kwargs):
+            saved.append(instance.pk)
+        signals.post_save.connect(on_save, sender=Entry)
+        try:
+            call_command('publish_scheduled_entries', verbosity=0)
+        finally:
+            signals.post_save.disconnect(on_save, sender=Entry)
+        self.assertEquals(saved, [entry.pk])
+        self.assertEquals(list(Entry.objects.filter(is_visible=True)), [entry])
+        self.assertEquals(Entry.objects.publish_scheduled(), [])
+
+    def test_02_visible_flag(self):
+        import cmsplugin_blog.models
+        title, entry = self.create_entry_with_title(published=True,
+            published_at=datetime.datetime.now() - datetime.timedelta(hours=1))
+        self.assertTrue(entry.is_visible)
+        Entry.objects.update(is_visible=False)
+        cmsplugin_blog.models.CMSPLUGIN_BLOG_SCHEDULER = True
+        try:
+            self.assertEquals(Entry.published.count(), 0)
+            Entry.objects.publish_scheduled()
+            self.assertEquals(Entry.published.count(), 1)
+        finally:
+            cmsplugin_blog.models.CMSPLUGIN_BLOG_SCHEDULER = False
+
+class EntryListingTestCase(BaseBlogTestCase):
+
+    def test_01_sync(self):
+        from cmsplugin_blog.models import EntryListing
+        with SettingsOverride(CMSPLUGIN_BLOG_USE_LISTINGS=True):
+            published_at = datetime.datetime.now() - datetime.timedelta(hours=1)
+            author = User.objects.all()[0]
+            title, entry = self.create_entry_with_title(published=True,
+                published_at=published_at, author=author)
+            de_title = self.create_entry_title(entry, title='Eintrag', language='de')
+            self.assertEquals(EntryListing.objects.count(), 2)
+            listing = EntryListing.objects.get(entry=entry, language='en')
+            self.assertEquals(listing.url, title.get_absolute_url())
+            self.assertEquals(listing.author_username, author.username)
+            self.assertTrue(listing.is_visible)
+            author.username = 'renamed'
+            author.save()
+            self.assertEquals(EntryListing.objects.get(pk=listing.pk).author_username, 'renamed')
+            entry.is_published = False
+            entry.save()
+            self.assertEquals(EntryListing.objects.filter(is_published=True).count(), 0)
+            de_title.delete()
+            self.assertEquals(list(EntryListing.objects.values_list('language', flat=True)), ['en'])
+
+    def test_02_listed(self):
+        from django.core.management import call_command
+        published_at = datetime.datetime.now() - datetime.timedelta(hours=1)
+        title, entry = self.create_entry_with_title(published=True, published_at=published_at)
+        self.create_entry_title(entry, title='Eintrag', language='de')
+        older_title, older = self.create_entry_with_title(published=True,
+            published_at=published_at - datetime.timedelta(days=1), slug='older')
+        self.create_entry_with_title(published=False, published_at=published_at, slug='draft')
+        with SettingsOverride(CMSPLUGIN_BLOG_USE_LISTINGS=True):
+            call_command('rebuild_entry_listings', verbosity=0)
+            self.assertEquals(list(Entry.objects.listed('en')), [entry, older])
+            self.assertEquals(list(Entry.objects.listed('de')), [entry])
+            response = self.client.get(reverse('en:blog_archive_index'))
+            self.assertEquals(list(response.context['latest']), [entry, older])
+            response = self.client.get(reverse('de:blog_rss'))
+            self.assertContains(response, 'Eintrag')
+            self.assertNotContains(response, older_title.title)
+
+class EntryTagTestCase(BaseBlogTestCase):
+
+    def test_01_sync(self):
+        from cmsplugin_blog.models import EntryTag
+        published_at = datetime.datetime.now() - datetime.timedelta(hours=1)
+        title, entry = self.create_entry_with_title(published=True, published_at=published_at)
+        entry.tags = 'django python'
+        entry.save()
+        self.assertEquals(sorted(EntryTag.objects.filter(entry=entry).values_list('tag__name', flat=True)),
+            ['django', 'python'])
+        entry.tags = 'django'
+        entry.is_published = False
+        entry.save()
+        self.assertEquals(list(EntryTag.objects.values_list('tag__name', 'is_published')), [('django', False)])
+        entry.delete()
+        self.assertEquals(EntryTag.objects.count(), 0)
+
+    def test_02_tagged_reads(self):
+        published_at = datetime.datetime.now() - datetime.timedelta(hours=1)
+        title, entry = self.create_entry_with_title(published=True, published_at=published_at,
+            title='tagged title')
+        entry.tags = 'django'
+        entry.save()
+        other_title, other = self.create_entry_with_title(published=True, published_at=published_at,
+            title='other title')
+        other.tags = 'python'
+        other.save()
+        self.assertEquals(list(Entry.objects.tagged_with(Tag.objects.get(name='django'))), [entry])
+        connection.use_debug_cursor = True
+        try:
+            for url in (reverse('en:blog_archive_tagged', kwargs={'tag': 'django'}),
+                    reverse('en:blog_rss_tagged', kwargs={'tag': 'django'}),
+                    reverse('en:blog_rss_any_tagged', kwargs={'tag': 'django'})):
+                response = self.client.get(url)
+                self.assertContains(response, 'tagged title')
+                self.assertNotContains(response, 'other title')
+                self.assertFalse([query for query in connection.queries
+                    if 'tagging_taggeditem' in query['sql']])
+        finally:
+            connection.use_debug_cursor = False
+
+class TagCountTestCase(BaseBlogTestCase):
+
+    def get_cloud(self, language='en'):
+        from cmsplugin_blog.models import TagCount
+        return [(tag.name, tag.count) for tag in TagCount.objects.cloud(language)]
+
+    def test_01_counts(self):
+        published_at = datetime.datetime.now() - datetime.timedelta(hours=1)
+        title, entry = self.create_entry_with_title(published=True, published_at=published_at)
+        entry.tags = 'django python'
+        entry.save()
+        other_title, other = self.create_entry_with_title(published=True, published_at=published_at,
+            title='other title')
+        other.tags = 'django'
+        other.save()
+        self.create_entry_title(other, title='anderer Titel', language='de')
+        self.assertEquals(self.get_cloud(), [('django', 2), ('python', 1)])
+        self.assertEquals(self.get_cloud('de'), [('django', 1)])
+        entry.is_published = False
+        entry.save()
+        self.assertEquals(self.get_cloud(), [('django', 1)])
+        other.tags = 'python'
+        other.save()
+        self.assertEquals(self.get_cloud(), [('python', 1)])
+        other.entrytitle_set.get(language='de').delete()
+        self.assertEquals(self.get_cloud('de'), [])
+        other.delete()
+        self.assertEquals(self.get_cloud(), [])
+
+    def test_02_scheduled(self):
+        from cmsplugin_blog.models import TagCount
+        title, entry = self.create_entry_with_title(published=True,
+            published_at=datetime.datetime.now() + datetime.timedelta(hours=1))
+        entry.tags = 'django'
+        entry.save()
+        self.assertEquals(self.get_cloud(), [])
+        Entry.objects.filter(pk=entry.pk).update(pub_date=datetime.datetime.now() - datetime.timedelta(hours=1))
+        Entry.objects.publish_scheduled()
+        self.assertEquals(self.get_cloud(), [('django', 1)])
+        self.assertEquals(TagCount.objects.get().last_used, Entry.objects.get().pub_date)
+
+    def test_03_tag_links(self):
+        from django.template import Context, Template
+        from django.test.client import RequestFactory
+        published_at = datetime.datetime.now() - datetime.timedelta(hours=1)
+        title, entry = self.create_entry_with_title(published=True, published_at=published_at)
+        entry.tags = 'django'
+        entry.save()
+        request = RequestFactory().get('/en/')
+        request.LANGUAGE_CODE = 'en'
+        template = Template('{% load cmsplugin_blog_tags %}{% render_tag_links %}')
+        # the cloud and the next scheduled publication capping the cache timeout
+        self.assertEquals(self.count_queries(template.render, Context({'request': request})), 2)
+        self.assertEquals(self.count_queries(template.render, Context({'request': request})), 0)
+        rendered = template.render(Context({'request': request}))
+        self.assertTrue('tag-cloud-' in rendered)
+        self.assertTrue('django</a> (1)' in rendered)
+
+    def test_04_replace(self):
+        from cmsplugin_blog.models import TagCount
+        published_at = datetime.datetime.now() - datetime.timedelta(hours=1)
+        title, entry = self.create_entry_with_title(published=True, published_at=published_at)
+        entry.tags = 'django'
+        entry.save()
+        count = TagCount.objects.get()
+        other_title, other = self.create_entry_with_title(published=True, published_at=published_at,
+            title='other title')
+        other.tags = 'django'
+        other.save()
+        # recounting updates the counts in place
+        self.assertEquals(self.get_cloud(), [('django', 2)])
+        self.assertEquals(TagCount.objects.get().pk, count.pk)
+        # a count created by a concurrent refresh is updated
+        TagCount.objects.replace(TagCount.objects.none(), ('tag', 'language'), [{'tag_id': count.tag_id,
+            'language': 'en', 'count': 3, 'last_used': published_at}])
+        self.assertEquals(self.get_cloud(), [('django', 3)])
+        self.assertEquals(TagCount.objects.get().pk, count.pk)
+
+class MonthArchiveTestCase(BaseBlogTestCase):
+
+    def get_months(self, language='en', year=None):
+        from cmsplugin_blog.models import MonthArchive
+        return [(month.date, month.count) for month in MonthArchive.objects.months(language, year)]
+
+    def test_01_counts(self):
+        title, entry = self.create_entry_with_title(published=True,
+            published_at=datetime.datetime(2011, 8, 30, 11, 0))
+        other_title, other = self.create_entry_with_title(published=True,
+            published_at=datetime.datetime(2011, 8, 1, 0, 0), title='other title')
+        self.create_entry_title(other, title='anderer Titel', language='de')
+        self.create_entry_with_title(published=False, published_at=datetime.datetime(2011, 7, 1, 0, 0),
+            title='draft title')
+        self.assertEquals(self.get_months(), [(datetime.datetime(2011, 8, 1), 2)])
+        self.assertEquals(self.get_months('de'), [(datetime.datetime(2011, 8, 1), 1)])
+        other.pub_date = datetime.datetime(2011, 12, 31, 23, 59)
+        other.save()
+        self.assertEquals(self.get_months(), [(datetime.datetime(2011, 8, 1), 1), (datetime.datetime(2011, 12, 1), 1)])
+        self.assertEquals(self.get_months('de', 2011), [(datetime.datetime(2011, 12, 1), 1)])
+        self.assertEquals(self.get_months('de', 2010), [])
+        other.entrytitle_set.get(language='de').delete()
+        self.assertEquals(self.get_months('de'), [])
+        entry.delete()
+        self.assertEquals(self.get_months(), [(datetime.datetime(2011, 12, 1), 1)])
+
+    def test_02_year_archive(self):
+        title, entry = self.create_entry_with_title(published=True,
+            published_at=datetime.datetime(2011, 8, 30, 11, 0))
+        other_title, other = self.create_entry_with_title(published=True,
+            published_at=datetime.datetime(2011, 3, 1, 11, 0), title='anderer Titel', language='de')
+        connection.use_debug_cursor = True
+        try:
+            response = self.client.get(reverse('en:blog_archive_year', kwargs={'year': '2011'}))
+            self.assertFalse([query for query in connection.queries
+                if 'cmsplugin_blog_entry' in query['sql'] and 'django_date_trunc' in query['sql']])
+        finally:
+            connection.use_debug_cursor = False
+        self.assertEquals(list(response.context['date_list']), [datetime.datetime(2011, 8, 1)])
+        # the German entry is left out of the English archive
+        self.assertEquals([item.pk for item in response.context['object_list']], [entry.pk])
+
+    def test_03_month_links(self):
+        from django.template import Context, Template
+        from django.test.client import RequestFactory
+        self.create_entry_with_title(published=True, published_at=datetime.datetime(2011, 8, 30, 11, 0))
+        request = RequestFactory().get('/en/')
+        request.LANGUAGE_CODE = 'en'
+        rendered = Template('{% load cmsplugin_blog_tags %}{% render_month_links 1 %}').render(
+            Context({'request': request}))
+        self.assertTrue('August 2011</a> (1)' in rendered)
+
+    def test_04_scheduled(self):
+        published_at = datetime.datetime.now() + datetime.timedelta(hours=1)
+        title, entry = self.create_entry_with_title(published=True, published_at=published_at)
+        self.assertEquals(self.get_months(), [])
+        published_at = datetime.datetime.now() - datetime.timedelta(hours=1)
+        Entry.objects.filter(pk=entry.pk).update(pub_date=published_at)
+        Entry.objects.publish_scheduled()
+        self.assertEquals(self.get_months(), [(datetime.datetime(published_at.year, published_at.month, 1), 1)])
+        response = self.client.get(reverse('en:blog_archive_year', kwargs={'year': published_at.year}))
+        self.assertEquals([item.pk for item in response.context['object_list']], [entry.pk])
+        self.assertEquals(len(response.context['date_list']), 1)
+
+class AuthorCountTestCase(BaseBlogTestCase):
+
+    def get_directory(self, language='en'):
+        from cmsplugin_blog.models import AuthorCount
+        return [(author.username, author.count) for author in AuthorCount.objects.directory(language)]
+
+    def test_01_counts(self):
+        user = User.objects.all()[0]
+        other_user = User.objects.create(username='other')
+        published_at = datetime.datetime.now() - datetime.timedelta(hours=1)
+        title, entry = self.create_entry_with_title(published=True, published_at=published_at, author=user)
+        other_title, other = self.create_entry_with_title(published=True, published_at=published_at,
+            title='other title', author=user)
+        self.create_entry_title(other, title='anderer Titel', language='de', author=other_user)
+        self.create_entry_with_title(published=False, title='draft title', author=other_user)
+        self.assertEquals(self.get_directory(), [(user.username, 2)])
+        self.assertEquals(self.get_directory('de'), [('other', 1)])
+        other_title.author = other_user
+        other_title.save()
+        self.assertEquals(self.get_directory(), [(user.username, 1), ('other', 1)])
+        entry.is_published = False
+        entry.save()
+        self.assertEquals(self.get_directory(), [('other', 1)])
+        other.delete()
+        self.assertEquals(self.get_directory(), [])
+        self.assertEquals(self.get_directory('de'), [])
+
+    def test_02_rename(self):
+        from cmsplugin_blog.templatetags.cmsplugin_blog_tags import render_author_links
+        class MockRequest(object):
+            LANGUAGE_CODE = 'en'
+            REQUEST = {}
+        user = User.objects.create(username='author')
+        self.create_entry_with_title(published=True,
+            published_at=datetime.datetime.now() - datetime.timedelta(hours=1), author=user)
+        self.assertEquals(render_author_links({'request': MockRequest()})['authors'], ['author'])
+        user.username = 'renamed'
+        user.save()
+        self.assertEquals(render_author_links({'request': MockRequest()})['authors'], ['renamed'])
+        response = self.client.get(reverse('en:blog_archive_author', kwargs={'author': 'renamed'}))
+        self.assertContains(response, 'Entry title')
+        response = self.client.get(reverse('en:blog_archive_author', kwargs={'author': 'author'}))
+        self.assertNotContains(response, 'Entry title')
+
+    def test_03_author_archive(self):
+        user = User.objects.all()[0]
+        self.create_entry_with_title(published=True,
+            published_at=datetime.datetime.now() - datetime.timedelta(hours=1), author=user)
+        connection.use_debug_cursor = True
+        try:
+            for url in (reverse('en:blog_archive_author', kwargs={'author': user.username}),
+                    reverse('en:blog_rss_author', kwargs={'author': user.username})):
+                self.assertContains(self.client.get(url), 'Entry title')
+                self.assertFalse([query for query in connection.queries
+                    if 'FROM "cmsplugin_blog_entry"' in query['sql'] and 'auth_user' in query['sql']])
+        finally:
+            connection.use_debug_cursor = False
+
+    def test_04_scheduled(self):
+        user = User.objects.all()[0]
+        title, entry = self.create_entry_with_title(published=True, author=user,
+            published_at=datetime.datetime.now() + datetime.timedelta(hours=1))
+        self.assertEquals(self.get_directory(), [])
+        Entry.objects.filter(pk=entry.pk).update(pub_date=datetime.datetime.now() - datetime.timedelta(hours=1))
+        Entry.objects.publish_scheduled()
+        self.assertContains(self.client.get(reverse('en:blog_archive_author',
+            kwargs={'author': user.username})), 'Entry title')
+        self.assertEquals(self.get_directory(), [(user.username, 1)])
+
+class CursorPaginationTestCase(BaseBlogTestCase):
+
+    def setUp(self):
+        super(CursorPaginationTestCase, self).setUp()
+        self.author = User.objects.all()[0]
+        published_at = datetime.datetime.now() - datetime.timedelta(hours=1)
+        self.entries = []
+        for i in range(20):
+            # pairs of entries share a publication date, the id breaks the tie
+            title, entry = self.create_entry_with_title(published=True, author=self.author,
+                published_at=published_at - datetime.timedelta(days=i / 2), slug='entry-%s' % i)
+            self.entries.append(entry)
+        self.entries.sort(key=lambda entry: (entry.pub_date, entry.pk), reverse=True)
+
+    def walk(self, url, context_name):
+        with SettingsOverride(CMSPLUGIN_BLOG_CURSOR_PAGINATION=True):
+            first = self.client.get(url)
+            self.assertEquals(list(first.context[context_name]), self.entries[:15])
+            self.assertFalse(first.context['page_obj'].has_previous())
+            second = self.client.get(first.context['page_obj'].next_url())
+            self.assertEquals(list(second.context[context_name]), self.entries[15:])
+            self.assertFalse(second.context['page_obj'].has_next())
+            self.assertContains(second, 'rel="prev"')
+            back = self.client.get(second.context['page_obj'].previous_url())
+            self.assertEquals(list(back.context[context_name]), self.entries[:15])
+            self.assertFalse(back.context['page_obj'].has_previous())
+
+    def test_01_archive_index(self):
+        self.walk(reverse('en:blog_archive_index'), 'latest')
+
+    def test_02_author_archive(self):
+        self.walk(reverse('en:blog_archive_author', kwargs={'author': self.author.username}), 'object_list')
+
+    def test_03_cursor(self):
+        from cmsplugin_blog.pagination import encode_cursor, decode_cursor
+        entry = self.entries[0]
+        self.assertEquals(decode_cursor(encode_cursor(entry)), (entry.pub_date, entry.pk))
+        self.assertRaises(Http404, decode_cursor, 'bogus')
+
+    def test_04_no_count(self):
+        url = reverse('en:blog_archive_index')
+        request_queries = []
+        def get():
+            request_queries.append(len(connection.queries))
+            self.client.get(url)
+        with SettingsOverride(CMSPLUGIN_BLOG_CURSOR_PAGINATION=True):
+            self.client.get(url)
+            self.count_queries(get)
+        queries = connection.queries[request_queries[0]:]
+        self.assertFalse([query for query in queries if 'COUNT(' in query['sql']])
+
+class ConditionalGetTestCase(BaseBlogTestCase):
+
+    def setUp(self):
+        super(ConditionalGetTestCase, self).setUp()
+        published_at = datetime.datetime.now() - datetime.timedelta(hours=1)
+        self.title, self.entry = self.create_entry_with_title(published=True,
+            published_at=published_at)
+        self.entry.tags = 'django'
+        self.entry.save()
+        self.add_text_plugin(self.entry)
+
+    def test_01_not_modified(self):
+        for url in (reverse('en:blog_archive_index'), self.title.get_absolute_url(),
+                reverse('en:blog_archive_tagged', kwargs={'tag': 'django'}),
+                reverse('en:blog_rss'), reverse('en:blog_rss_any_tagged', kwargs={'tag': 'django'})):
+            response = self.client.get(url)
+            self.assertEquals(response.status_code, 200)
+            etag = response['ETag']
+            last_modified = response['Last-Modified']
+            # the cms still resolves the page of the apphook, the blog queries nothing
+            queries = self.count_queries(self.client.get, url, HTTP_IF_NONE_MATCH=etag)
+            self.assertFalse([query for query in connection.queries[len(connection.queries) - queries:]
+                if 'cmsplugin_blog' in query['sql'] or 'cmsplugin_text' in query['sql']])
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEquals(response.status_code, 304)
+            response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+            self.assertEquals(response.status_code, 304)
+
+    def test_02_modified(self):
+        url = reverse('en:blog_archive_index')
+        etag = self.client.get(url)['ETag']
+        self.add_text_plugin(self.entry, body='Changed')
+        self.assertEquals(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+        other_url = reverse('en:blog_archive_tagged', kwargs={'tag': 'django'})
+        self.assertEquals(self.client.get(other_url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_03_editors(self):
+        self.client.login(username='admin', password='admin')
+        response = self.client.get(reverse('en:blog_archive_index'))
+        self.assertFalse(response.has_header('ETag'))
+
+    def test_04_pages(self):
+        from cms.api import add_plugin
+        from cms.models import Title
+        url = reverse('en:blog_archive_index')
+        etag = self.client.get(url)['ETag']
+        # the page the blog is hooked into is renamed
+        title = Title.objects.get(application_urls='BlogApphook', language='en')
+        title.title = 'Renamed'
+        title.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEquals(response.status_code, 200)
+        etag = response['ETag']
+        # a plugin of a page changes
+        add_plugin(Placeholder.objects.create(slot='content'), 'TextPlugin', 'en', body='page')
+        self.assertEquals(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_05_plugins(self):
+        from cms.api import add_plugin
+        from cmsplugin_blog.cache import get_generation
+        # the plugins of pages leave the blog cache alone
+        generation = get_generation()
+        page_plugin = add_plugin(Placeholder.objects.create(slot='content'), 'TextPlugin', 'en', body='page')
+        page_plugin.delete()
+        self.assertEquals(get_generation(), generation)
+        entry_plugin = add_plugin(self.entry.get_placeholders(create=True)['content'], 'TextPlugin', 'en', body='entry')
+        self.assertNotEquals(get_generation(), generation)
+        generation = get_generation()
+        entry_plugin.delete()
+        self.assertNotEquals(get_generation(), generation)
+
+class FeedCacheTestCase(BaseBlogTestCase):
+
+    def test_01_cached_feed(self):
+        published_at = datetime.datetime.now() - datetime.timedelta(hours=1)
+        title, entry = self.create_entry_with_title(published=True, published_at=published_at)
+        url = reverse('en:blog_rss')
+        response = self.client.get(url)
+        self.assertContains(response, title.title)
+        queries = self.count_queries(self.client.get, url)
+        self.assertFalse([query for query in connection.queries[len(connection.queries) - queries:]
+            if 'cmsplugin_blog' in query['sql']])
+        self.assertEquals(self.client.get(url).content, response.content)
+        title.title = 'Changed title'
+        title.save()
+        self.assertContains(self.client.get(url), 'Changed title')
+
+    def test_02_cache_bits(self):
+        published_at = datetime.datetime.now() - datetime.timedelta(hours=1)
+        title, entry = self.create_entry_with_title(published=True, published_at=published_at)
+        entry.tags = 'django'
+        entry.save()
+        self.assertContains(self.client.get(reverse('en:blog_rss_tagged', kwargs={'tag': 'django'})), title.title)
+        Tag.objects.create(name='python')
+        self.assertNotContains(self.client.get(reverse('en:blog_rss_tagged', kwargs={'tag': 'python'})), title.title)
+        self.assertContains(self.client.get(reverse('en:blog_rss_any')), title.title)
+        self.assertNotContains(self.client.get(reverse('de:blog_rss')), title.title)
+
+    def test_03_any_tag(self):
+        published_at = datetime.datetime.now() - datetime.timedelta(hours=1)
+        title, entry = self.create_entry_with_title(published=True, published_at=published_at)
+        entry.tags = 'django python'
+        entry.save()
+        other_title, other = self.create_entry_with_title(published=True, published_at=published_at,
+            title='other title')
+        other.tags = 'python'
+        other.save()
+        response = self.client.get(reverse('en:blog_rss_tagged', kwargs={'tag': 'django,python'}))
+        self.assertEquals(response.content.count(title.title), 1)
+        self.assertContains(response, other_title.title)
+        response = self.client.get(reverse('en:blog_rss_any_tagged', kwargs={'tag': 'django,unknown'}))
+        self.assertContains(response, title.title)
+        self.assertNotContains(response, other_title.title)
+
+    def test_04_unknown(self):
+        from django.core.cache import cache
+        from django.test.client import RequestFactory
+        from cmsplugin_blog.feeds import AuthorEntriesFeed, TaggedEntriesFeed
+        published_at = datetime.datetime.now() - datetime.timedelta(hours=1)
+        title, entry = self.create_entry_with_title(published=True, published_at=published_at,
+            author=User.objects.all()[0])
+        cache.clear()
+        get_feed_keys = lambda: [key for key in cache._cache if ':feed:' in key]
+        # no feed is cached for names that do not exist
+        request = RequestFactory().get('/en/test-page-1/rss/')
+        self.assertRaises(Http404, TaggedEntriesFeed(), request, tag='unknown')
+        self.assertRaises(Http404, AuthorEntriesFeed(), request, author='unknown')
+        self.assertEquals(get_feed_keys(), [])
+        self.assertContains(self.client.get(reverse('en:blog_rss_author', kwargs={'author': title.author.username})),
+            title.title)
+        self.assertEquals(len(get_feed_keys()), 1)
+
+class EntryUrlTestCase(BaseBlogTestCase):
+
+    def setUp(self):
+        super(EntryUrlTestCase, self).setUp()
+        from django.utils.translation import activate
+        activate('en')
+        self.title, self.entry = self.create_entry_with_title(published=True,
+            published_at=datetime.datetime(2011, 8, 31, 11, 0))
+        self.de_title = self.create_entry_title(self.entry, title='german', language='de')
+
+    def test_01_stored(self):
+        self.assertEquals(self.title.url, u'/test-page-1/2011/08/31/entry-title/')
+        self.assertEquals(self.de_title.url, u'/test-page-1/2011/08/31/german/')
+        # neither the entry nor the URL resolvers are needed to link to a title
+        title = EntryTitle.objects.get(pk=self.title.pk)
+        de_title = EntryTitle.objects.get(pk=self.de_title.pk)
+        self.assertEquals(self.count_queries(title.get_absolute_url), 0)
+        self.assertEquals(title.get_absolute_url(), u'/test-page-1/2011/08/31/entry-title/')
+        self.assertEquals(de_title.get_absolute_url(), u'/de/test-page-1/2011/08/31/german/')
+        self.assertEquals(self.entry.get_absolute_url('de'), u'/test-page-1/2011/08/31/german/')
+
+    def test_02_changes(self):
+        self.title.slug = 'renamed'
+        self.title.save()
+        self.assertEquals(EntryTitle.objects.get(pk=self.title.pk).url, u'/test-page-1/2011/08/31/renamed/')
+        self.entry.pub_date = datetime.datetime(2011, 9, 1, 11, 0)
+        self.entry.save()
+        self.assertEquals(sorted(EntryTitle.objects.values_list('url', flat=True)),
+            [u'/test-page-1/2011/09/01/german/', u'/test-page-1/2011/09/01/renamed/'])
+        # saving the entry again leaves the titles alone
+        self.assertEquals(self.count_queries(self.entry.save),
+            self.count_queries(self.entry.save))
+
+    def test_03_rebuild(self):
+        from django.core.management import call_command
+        EntryTitle.objects.update(url='/moved/')
+        call_command('rebuild_entry_urls', verbosity=0)
+        self.assertEquals(sorted(EntryTitle.objects.values_list('url', flat=True)),
+            [u'/test-page-1/2011/08/31/entry-title/', u'/test-page-1/2011/08/31/german/'])
+        self.assertEquals(EntryTitle.objects.rebuild_urls(), 0)
+
+class BenchmarkTestCase(BaseBlogTestCase):
+
+    def test_01_query_budgets(self):
+        from cmsplugin_blog.test.benchmark import Benchmark, BUDGETS, check_budgets
+        from cms.models import Page
+        benchmark = Benchmark(self.client)
+        benchmark.seed(Page.objects.get(parent__isnull=True))
+        results = benchmark.run()
+        self.assertEquals(sorted([result['name'] for result in results]), sorted(BUDGETS.keys()))
+        check_budgets(results)
+        self.assertRaises(AssertionError, check_budgets, results, dict(BUDGETS, blog_rss=0))
+
 class SitemapsTestCase(BaseBlogTestCase):
     
     def test_01_sitemaps(self):
@@ -353,3 +1312,62 @@ class SitemapsTestCase(BaseBlogTestCase):
             published_at=published_at)
         response = self.client.get('/sitemap.xml')
         self.assertEquals(response.status_code, 200)
+
+    def test_02_published_titles(self):
+        from cmsplugin_blog.sitemaps import BlogSitemap
+        published_at = datetime.datetime(2011, 8, 31, 11, 0)
+        title, entry = self.create_entry_with_title(published=True, published_at=published_at)
+        de_title = self.create_entry_title(entry, title='german', language='de')
+        self.create_entry_with_title(published=True, slug='scheduled',
+            published_at=datetime.datetime.now() + datetime.timedelta(days=1))
+        self.create_entry_with_title(published=False, slug='draft', published_at=published_at)
+        from django.utils.translation import activate
+        activate('en')
+        urls = BlogSitemap().get_urls()
+        self.assertEquals([url['location'] for url in urls], [
+            'http://example.com/de/test-page-1/2011/08/31/german/',
+            'http://example.com/en/test-page-1/2011/08/31/entry-title/'])
+        self.assertEquals(urls[0]['alternates'], [
+            ('de', 'http://example.com/de/test-page-1/2011/08/31/german/'),
+            ('en', 'http://example.com/en/test-page-1/2011/08/31/entry-title/')])
+        self.assertEquals(urls[0]['lastmod'], published_at)
+        # not negotiated by the language of the request
+        activate('de')
+        self.assertEquals(BlogSitemap().get_urls(), urls)
+        activate('en')
+        # the prefix wins over the language of the visitor
+        response = self.client.get(urls[1]['location'][len('http://example.com'):], HTTP_ACCEPT_LANGUAGE='de')
+        self.assertContains(response, title.title)
+
+    def test_03_pages(self):
+        from cmsplugin_blog.sitemaps import BlogSitemap
+        for day in range(1, 6):
+            title, entry = self.create_entry_with_title(published=True, slug='entry-%s' % day,
+                published_at=datetime.datetime(2011, 8, day, 11, 0))
+            self.create_entry_title(entry, title='german %s' % day, language='de')
+        sitemap = BlogSitemap()
+        sitemap.limit = 3
+        urls = sitemap.get_urls(page=2)
+        # the titles of an entry are complete on both pages it is listed on
+        self.assertEquals([len(url['alternates']) for url in urls], [2, 2, 2])
+        self.assertEquals(self.count_queries(lambda: BlogSitemap().get_urls()), 2)
+
+    def test_04_index(self):
+        for year in (2010, 2011):
+            self.create_entry_with_title(published=True, slug='entry-%s' % year,
+                published_at=datetime.datetime(year, 8, 31, 11, 0))
+        response = self.client.get('/sitemap-index.xml')
+        self.assertContains(response, '<loc>http://example.com/sitemap-blog-2010.xml</loc>')
+        self.assertContains(response, '<loc>http://example.com/sitemap-blog-2011.xml</loc>')
+        response = self.client.get('/sitemap-blog-2011.xml')
+        self.assertContains(response, '/2011/08/31/entry-2011/')
+        self.assertNotContains(response, '/2010/08/31/entry-2010/')
+        # the finished parts are cached until the blog changes
+        from django.test.client import RequestFactory
+        from django.utils.translation import activate
+        from cmsplugin_blog.sitemaps import sitemap
+        # in every language of the requests
+        activate('de')
+        self.assertEquals(self.count_queries(sitemap, RequestFactory().get('/sitemap-blog-2011.xml'), 'blog-2011'), 0)
+        activate('en')
+        self.assertRaises(Http404, sitemap, RequestFactory().get('/sitemap-blog-2009.xml'), 'blog-2009')
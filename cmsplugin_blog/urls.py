@@ -1,19 +1,25 @@
 from django.conf import settings
 from django.conf.urls.defaults import *
 from django.core.urlresolvers import reverse
-from django.views.generic.date_based import archive_year, archive_month, archive_day, object_detail
+from django.http import Http404
+from django.shortcuts import render_to_response
+from django.template import RequestContext
+from django.views.generic.date_based import archive_month, archive_day, object_detail
 from django.views.generic.list_detail import object_list
 
-from tagging.views import tagged_object_list
+from tagging.utils import get_tag
 
 from menus.utils import set_language_changer
 
 from cms.models import Title
 from cms.utils.urlutils import urljoin
 
+from cmsplugin_blog.decorators import conditional
 from cmsplugin_blog.feeds import EntriesFeed, TaggedEntriesFeed, AuthorEntriesFeed
-from cmsplugin_blog.models import Entry
-from cmsplugin_blog.views import EntryDateDetailView, EntryArchiveIndexView
+from cmsplugin_blog.models import AuthorCount, Entry
+from cmsplugin_blog.pagination import paginate_by_cursor
+from cmsplugin_blog.utils import use_cursor_pagination
+from cmsplugin_blog.views import EntryDateDetailView, EntryArchiveIndexView, EntryYearArchiveView
 
 blog_info_dict = {
     'queryset': Entry.objects.all(),
@@ -23,7 +29,7 @@ blog_info_dict = {
 }
 
 blog_info_tagged_dict = {
-    'queryset_or_model': Entry.objects.all(),
+    'queryset': Entry.objects.all(),
     'allow_empty': True,
 }
 
@@ -53,37 +59,50 @@ def language_changer(lang):
     request = language_changer.request
     return request.get_full_path()
 
-blog_archive_index = EntryArchiveIndexView.as_view()
+blog_archive_index = conditional(EntryArchiveIndexView.as_view())
 
-def blog_archive_year(request, **kwargs):
-    kwargs['queryset'] = kwargs['queryset'].published()
-    set_language_changer(request, language_changer)
-    return archive_year(request, **kwargs)
-    
+blog_archive_year = conditional(EntryYearArchiveView.as_view())
+
+@conditional
 def blog_archive_month(request, **kwargs):
     kwargs['queryset'] = kwargs['queryset'].published()
     set_language_changer(request, language_changer)
     return archive_month(request, **kwargs)
 
+@conditional
 def blog_archive_day(request, **kwargs):
     kwargs['queryset'] = kwargs['queryset'].published()
     set_language_changer(request, language_changer)
     return archive_day(request, **kwargs)
 
-blog_detail = EntryDateDetailView.as_view()
+blog_detail = conditional(EntryDateDetailView.as_view())
 
+@conditional
 def blog_archive_tagged(request, **kwargs):
-    kwargs['queryset_or_model'] = kwargs['queryset_or_model'].published()
+    tag = get_tag(kwargs.pop('tag'))
+    if tag is None:
+        raise Http404
+    kwargs['queryset'] = kwargs['queryset'].tagged_with(tag)
+    kwargs['extra_context'] = {
+        'tag': tag,
+    }
     set_language_changer(request, language_changer)
-    return tagged_object_list(request, **kwargs)
+    return object_list(request, **kwargs)
 
+@conditional
 def blog_archive_author(request, **kwargs):
     author = kwargs.pop('author')
-    kwargs['queryset'] = kwargs['queryset'].published().filter(entrytitle__author__username=author)
+    kwargs['queryset'] = kwargs['queryset'].published().filter(
+        entrytitle__author__in=AuthorCount.objects.author_ids(author))
     kwargs['extra_context'] = {
         'author': author,
     }
     set_language_changer(request, language_changer)
+    if use_cursor_pagination():
+        page = paginate_by_cursor(request, kwargs['queryset'], blog_info_dict['paginate_by'])
+        context = dict(kwargs['extra_context'], paginator=None, page_obj=page,
+            is_paginated=page.has_other_pages(), object_list=page.object_list)
+        return render_to_response(kwargs['template_name'], context, context_instance=RequestContext(request))
     return object_list(request, **kwargs)
 
 urlpatterns = patterns('',
@@ -105,16 +124,16 @@ urlpatterns = patterns('',
 
     (r'^author/(?P<author>[^/]*)/$', blog_archive_author, blog_info_author_dict, 'blog_archive_author'),
     
-    (r'^rss/any/tagged/(?P<tag>[^/]*)/$', TaggedEntriesFeed(), {'any_language': True}, 'blog_rss_any_tagged'),
+    (r'^rss/any/tagged/(?P<tag>[^/]*)/$', conditional(TaggedEntriesFeed()), {'any_language': True}, 'blog_rss_any_tagged'),
     
-    (r'^rss/tagged/(?P<tag>[^/]*)/$', TaggedEntriesFeed(), {}, 'blog_rss_tagged'),
+    (r'^rss/tagged/(?P<tag>[^/]*)/$', conditional(TaggedEntriesFeed()), {}, 'blog_rss_tagged'),
     
-    (r'^rss/any/author/(?P<author>[^/]*)/$', AuthorEntriesFeed(), {'any_language': True}, 'blog_rss_any_author'),
+    (r'^rss/any/author/(?P<author>[^/]*)/$', conditional(AuthorEntriesFeed()), {'any_language': True}, 'blog_rss_any_author'),
     
-    (r'^rss/author/(?P<author>[^/]*)/$', AuthorEntriesFeed(), {}, 'blog_rss_author'),
+    (r'^rss/author/(?P<author>[^/]*)/$', conditional(AuthorEntriesFeed()), {}, 'blog_rss_author'),
     
-    (r'^rss/any/$', EntriesFeed(), {'any_language': True}, 'blog_rss_any'),
+    (r'^rss/any/$', conditional(EntriesFeed()), {'any_language': True}, 'blog_rss_any'),
     
-    (r'^rss/$', EntriesFeed(), {}, 'blog_rss')
+    (r'^rss/$', conditional(EntriesFeed()), {}, 'blog_rss')
     
 )
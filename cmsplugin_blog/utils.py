@@ -1,10 +1,24 @@
+from django.core.urlresolvers import reverse
 from django.utils.translation import get_language, ugettext_lazy as _
 from cms import settings
 from cms.middleware.multilingual import has_lang_prefix
+from cms.models import Title
+from cms.utils.urlutils import urljoin
+
+from cmsplugin_blog.cache import bump_blog_roots_generation, get_blog_roots_generation
+
+# (generation, language -> URL of the page the blog is hooked into), see get_blog_root
+_blog_roots = None
 
 def is_multilingual():
     return 'cmsplugin_blog.middleware.MultilingualBlogEntriesMiddleware' in settings.MIDDLEWARE_CLASSES
 
+def use_listings():
+    return getattr(settings, 'CMSPLUGIN_BLOG_USE_LISTINGS', False)
+
+def use_cursor_pagination():
+    return getattr(settings, 'CMSPLUGIN_BLOG_CURSOR_PAGINATION', False)
+
 def get_lang_name(lang):
     return _(dict(settings.LANGUAGES)[lang])
 
@@ -13,3 +27,39 @@ def add_current_root(url):
         new_root = "/%s" % get_language()
         url = new_root + url
     return url
+
+def add_language_prefix(url, language):
+    """
+        Returns the URL of a page in the given language as linked from the
+        current one: the other languages are reached through their prefix
+    """
+    if is_multilingual() and language != get_language():
+        url = '/%s%s' % (language, url)
+    return url
+
+def get_blog_root(language):
+    """
+        Returns the URL of the page the blog is hooked into in the given
+        language, or None. The pages of all languages are looked up at once
+        and kept in the process until a page title is saved or deleted or a
+        page is published or moved in any process, which bumps a generation
+        shared through the cache.
+    """
+    global _blog_roots
+    generation = get_blog_roots_generation()
+    if _blog_roots is not None and _blog_roots[0] == generation:
+        return _blog_roots[1].get(language)
+    roots = {}
+    pages_root = reverse('pages-root')
+    for title in Title.objects.filter(application_urls='BlogApphook'):
+        roots.setdefault(title.language, urljoin(pages_root, title.overwrite_url or title.slug))
+    _blog_roots = (generation, roots)
+    return roots.get(language)
+
+def clear_blog_roots(*args, **kwargs):
+    """
+        Forgets the blog roots in all processes, can be connected to signals
+    """
+    global _blog_roots
+    _blog_roots = None
+    bump_blog_roots_generation()
@@ -1,11 +1,12 @@
 import datetime
 try: # pragma: no cover
-    from django.views.generic.dates import BaseDateDetailView, ArchiveIndexView, _date_lookup_for_field, _date_from_string
+    from django.views.generic.dates import BaseDateDetailView, ArchiveIndexView, YearArchiveView, _date_lookup_for_field, _date_from_string
     from django.views.generic.detail import SingleObjectTemplateResponseMixin
 except ImportError: # pragma: no cover
     from cbv.views.detail import SingleObjectTemplateResponseMixin
-    from cbv.views.dates import BaseDateDetailView, ArchiveIndexView, _date_lookup_for_field, _date_from_string
+    from cbv.views.dates import BaseDateDetailView, ArchiveIndexView, YearArchiveView, _date_lookup_for_field, _date_from_string
 
+from django.conf import settings
 from django.http import Http404
 from django.shortcuts import redirect
 from django.utils.translation import ugettext_lazy as _
@@ -15,8 +16,11 @@ from menus.utils import set_language_changer
 
 from simple_translation.middleware import filter_queryset_language
 from simple_translation.utils import get_translation_filter, get_translation_filter_language
-from cmsplugin_blog.models import Entry
-from cmsplugin_blog.utils import is_multilingual
+from cmsplugin_blog.cache import cached_lookup
+from cmsplugin_blog.loaders import load_placeholders, load_plugins
+from cmsplugin_blog.models import Entry, EntryListing, EntryTitle, MonthArchive, get_published_filter, is_entry_published
+from cmsplugin_blog.pagination import paginate_by_cursor
+from cmsplugin_blog.utils import is_multilingual, use_listings, use_cursor_pagination
 
 class Redirect(Exception):
     def __init__(self, *args, **kwargs):
@@ -63,37 +67,104 @@ class EntryDateDetailView(DateDetailView):
     queryset = Entry.objects.all()
     
     def get_object(self):
-        try:
-            obj = super(EntryDateDetailView, self).get_object()
-        except Http404, e:
-            # No entry has been found for a given language, we fallback to search for an entry in any language
-            # Could find multiple entries, in this way we cannot decide which one is the right one, so we let
-            # exception be propagated FIXME later
-            if is_multilingual():
-                try:
-                    queryset = self.get_unfiltered_queryset()
-                    obj = super(EntryDateDetailView, self).get_object(queryset=queryset)
-                except Entry.MultipleObjectsReturned, s:
-                    raise e
-                # We know there is only one title for this entry, so we can simply use get()
-                raise Redirect(obj.entrytitle_set.get().get_absolute_url())
-            else:
-                raise e
-
+        year = self.get_year()
+        month = self.get_month()
+        day = self.get_day()
+        date = _date_from_string(year, self.get_year_format(),
+                                 month, self.get_month_format(),
+                                 day, self.get_day_format())
+        if not self.get_allow_future() and date > datetime.date.today() and not self.request.user.is_staff: # pragma: no cover
+            raise Http404(_(u"Future %(verbose_name_plural)s not available because %(class_name)s.allow_future is False.") % {
+                'verbose_name_plural': Entry._meta.verbose_name_plural,
+                'class_name': self.__class__.__name__,
+            })
+        slug = self.kwargs.get('slug')
+        loaded = {}
+        def resolve():
+            entries = self.get_entries(date, slug)
+            loaded.update([(entry.pk, entry) for entry in entries])
+            return self.resolve(entries, slug)
+        if self.request.user.is_staff or self.request.user.is_superuser:
+            found, value = resolve()
+        else:
+            # lookups that found nothing are cached as well, bots probe a lot of them
+            found, value = cached_lookup(['detail', getattr(self.request, 'LANGUAGE_CODE', None),
+                date, slug, is_multilingual()], resolve)
+        if found == 'redirect':
+            raise Redirect(value)
+        obj = found == 'entry' and (loaded.get(value) or self.get_entry(value))
+        if not obj:
+            raise Http404(_(u"No %(verbose_name)s found matching the query") %
+                {'verbose_name': Entry._meta.verbose_name})
+        load_placeholders([obj])
+        load_plugins(obj._placeholders_cache.values(), request=self.request)
+        obj._entry_loaded = True
         set_language_changer(self.request, obj.language_changer)
         return obj
-        
-    def get_unfiltered_queryset(self):
-        return super(EntryDateDetailView, self).get_queryset().published()
-            
-    def get_queryset(self):
-        queryset = super(EntryDateDetailView, self).get_queryset()
-        queryset = filter_queryset_language(self.request, queryset)
-        if self.request.user.is_staff or self.request.user.is_superuser:
-            return queryset
+
+    def resolve(self, entries, slug):
+        """
+            Decides between the entries found by get_entries, returns
+            ('entry', id), ('redirect', url) or ('missing', None)
+        """
+        language = getattr(self.request, 'LANGUAGE_CODE', None)
+        if language:
+            # prefer the entry whose title in the current language has the slug
+            matches = [entry for entry in entries
+                if language in [title.language for title in entry.translations]]
+            matches.sort(key=lambda entry: not [title for title in entry.translations
+                if title.language == language and title.slug == slug])
         else:
-            return queryset.published()
-    
+            matches = entries
+        if matches:
+            return 'entry', matches[0].pk
+        # No entry has been found for a given language, we fallback to an entry in any language,
+        # but only if a single published title of a single entry has the slug
+        if is_multilingual():
+            matches = [title for entry in entries if is_entry_published(entry)
+                for title in entry.translations if title.slug == slug]
+            if len(matches) == 1:
+                return 'redirect', matches[0].get_absolute_url()
+        return 'missing', None
+
+    def get_entries(self, date, slug):
+        """
+            Returns the entries published on the given date with a title
+            that has the slug, with all their titles as ``translations``,
+            from a single query
+        """
+        field = Entry._meta.get_field(self.get_date_field())
+        lookups = _date_lookup_for_field(field, date)
+        if not (self.request.user.is_staff or self.request.user.is_superuser):
+            lookups.update(get_published_filter())
+        return self.group_titles(EntryTitle.objects.filter(entry__entrytitle__slug=slug, **dict(
+            [('entry__%s' % key, value) for key, value in lookups.items()])))
+
+    def get_entry(self, pk):
+        """
+            Returns the entry with the given id and its titles, or None
+        """
+        entries = self.group_titles(EntryTitle.objects.filter(entry=pk))
+        return entries and entries[0] or None
+
+    def group_titles(self, titles):
+        languages = [code for code, name in settings.LANGUAGES]
+        entries, seen = {}, set()
+        for title in titles.select_related('entry', 'author'):
+            entry = entries.setdefault(title.entry_id, title.entry)
+            if title.pk in seen or title.language not in languages:
+                continue
+            seen.add(title.pk)
+            entry.translations = getattr(entry, 'translations', [])
+            # title.get_absolute_url() needs the entry's pub_date
+            title._entry_cache = entry
+            entry.translations.append(title)
+        entries = [entry for entry in entries.values() if getattr(entry, 'translations', None)]
+        for entry in entries:
+            entry.translations.sort(key=lambda title: languages.index(title.language))
+        entries.sort(key=lambda entry: entry.pk)
+        return entries
+            
     def dispatch(self, request, *args, **kwargs):
         try:
             return super(EntryDateDetailView, self).dispatch(request, *args, **kwargs)
@@ -103,12 +174,19 @@ class EntryDateDetailView(DateDetailView):
 class EntryArchiveIndexView(ArchiveIndexView):
     date_field = 'pub_date'
     allow_empty = True
+    # future entries are excluded by the published manager
+    allow_future = True
     paginate_by = 15
     template_name_field = 'template'
     queryset = Entry.objects.all()
 
     def get_dated_items(self):
-        items = super(EntryArchiveIndexView, self).get_dated_items()
+        language = getattr(self.request, 'LANGUAGE_CODE', None)
+        if use_listings() and language:
+            date_list = self.get_date_list(EntryListing.objects.published(language), 'year')
+            items = (date_list, self.get_queryset().listed(language), {})
+        else:
+            items = super(EntryArchiveIndexView, self).get_dated_items()
         from cmsplugin_blog.urls import language_changer
         set_language_changer(self.request, language_changer)
         return items
@@ -117,3 +195,35 @@ class EntryArchiveIndexView(ArchiveIndexView):
         queryset = super(EntryArchiveIndexView, self).get_dated_queryset(**lookup)
         queryset = filter_queryset_language(self.request, queryset)
         return queryset.published()
+
+    def paginate_queryset(self, queryset, page_size):
+        if not use_cursor_pagination():
+            return super(EntryArchiveIndexView, self).paginate_queryset(queryset, page_size)
+        page = paginate_by_cursor(self.request, queryset, page_size)
+        return (None, page, page.object_list, page.has_other_pages())
+
+class EntryYearArchiveView(YearArchiveView):
+    date_field = 'pub_date'
+    allow_empty = True
+    # future entries are excluded by the published manager
+    allow_future = True
+    make_object_list = True
+    queryset = Entry.objects.all()
+
+    def get_dated_items(self):
+        date_list, object_list, extra_context = super(EntryYearArchiveView, self).get_dated_items()
+        from cmsplugin_blog.urls import language_changer
+        set_language_changer(self.request, language_changer)
+        return date_list, object_list, extra_context
+
+    def get_date_list(self, queryset, date_type):
+        language = getattr(self.request, 'LANGUAGE_CODE', None)
+        if not language:
+            return super(EntryYearArchiveView, self).get_date_list(queryset, date_type)[::-1]
+        # the months with entries in the current language, read from the month archive
+        return [month.date for month in MonthArchive.objects.months(language, int(self.get_year()))]
+
+    def get_dated_queryset(self, **lookup):
+        queryset = super(EntryYearArchiveView, self).get_dated_queryset(**lookup)
+        queryset = filter_queryset_language(self.request, queryset)
+        return queryset.published()
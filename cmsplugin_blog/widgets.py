@@ -2,8 +2,6 @@ from django import forms
 from django.conf import settings
 from django.utils import simplejson
 from django.utils.safestring import mark_safe
-from tagging.models import Tag
-from cmsplugin_blog.models import Entry
 
 class AutoCompleteTagInput(forms.TextInput):
     class Media:
@@ -19,14 +17,20 @@ class AutoCompleteTagInput(forms.TextInput):
             '%scmsplugin_blog/jquery_init.js' % settings.STATIC_URL
         )
 
+    def __init__(self, attrs=None, tags_url=None):
+        super(AutoCompleteTagInput, self).__init__(attrs)
+        # set by the admin, see BaseEntryAdmin.get_form
+        self.tags_url = tags_url
+
     def render(self, name, value, attrs=None):
         output = super(AutoCompleteTagInput, self).render(name, value, attrs)
-        page_tags = Tag.objects.usage_for_model(Entry)
-        tag_list = simplejson.dumps([tag.name for tag in page_tags],
-                                    ensure_ascii=False)
+        if not self.tags_url:
+            return output
+        # suggestions are fetched from the admin as the user types
+        tags_url = simplejson.dumps(self.tags_url)
         return output + mark_safe(u'''<script type="text/javascript">
             
-            var availableTags = %s
+            var tagsUrl = %s
             
             function split( val ) {
                 return val.split( /,\s*|^/ );
@@ -46,9 +50,12 @@ class AutoCompleteTagInput(forms.TextInput):
                 .autocomplete({
                     minLength: 0,
                     source: function( request, response ) {
-                        // delegate back to autocomplete, but extract the last term
-                        response( blog.jQuery.ui.autocomplete.filter(
-                            availableTags, extractLast( request.term ) ) );
+                        // ask the server for the tags starting with the last term
+                        blog.jQuery.getJSON( tagsUrl, {
+                            term: extractLast( request.term )
+                        }, function( data ) {
+                            response( data.tags );
+                        });
                     },
                     focus: function() {
                         // prevent value inserted on focus
@@ -69,4 +76,4 @@ class AutoCompleteTagInput(forms.TextInput):
 
 
 
-            </script>''' % (tag_list, name))
+            </script>''' % (tags_url, name))